@@ -0,0 +1,83 @@
+# Import-time benchmark for the DIMO SDK. Imports the SDK in fresh interpreters,
+# reports the median import time and exits with status 1 when it exceeds the budget
+# or when a plain synchronous client loads a heavy optional dependency:
+#
+#     python benchmarks/import_time.py --budget-ms 300
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a synchronous DIMO client must not pull in until they are needed
+LAZY_MODULES = ("eth_account", "eth_keys", "asyncio", "httpx", "numpy", "sqlite3")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+from dimo import DIMO
+DIMO("Production")
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def probe(statement):
+    env = dict(
+        os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement)],
+        check=True,
+        capture_output=True,
+        env=env,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DIMO SDK import-time benchmark")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failures = []
+    for name, statement in (
+        ("import dimo", "import dimo"),
+        ("from dimo import DIMO", "from dimo import DIMO"),
+    ):
+        runs = [probe(statement) for _ in range(args.runs)]
+        median_ms = statistics.median(run["elapsed"] for run in runs) * 1000
+        results[name] = {"median_ms": round(median_ms, 2), "runs": args.runs}
+        print(f"{name:<24} {median_ms:8.1f} ms (median of {args.runs})")
+        if median_ms > args.budget_ms:
+            failures.append(
+                f"{name} took {median_ms:.1f} ms, budget is {args.budget_ms:.0f} ms"
+            )
+
+    loaded = sorted(set(LAZY_MODULES) & set(runs[-1]["modules"]))
+    results["eagerly_loaded"] = loaded
+    if loaded:
+        failures.append(
+            f"DIMO() loaded modules that should be lazy: {', '.join(loaded)}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# Local stand-in for the DIMO Auth, Identity, Telemetry, TokenExchange, Trips and
+# Valuations APIs, used by the benchmarks. Every response waits `latency` seconds,
+# Telemetry returns `telemetry_rows` signal rows and REST payloads are padded to
+# about `payload_bytes`.
+
+import base64
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICES = (
+    "Attestation",
+    "Auth",
+    "DeviceDefinitions",
+    "Identity",
+    "Telemetry",
+    "TokenExchange",
+    "Trips",
+    "User",
+    "Valuations",
+)
+
+
+def fake_jwt(lifetime: float = 3600.0) -> str:
+    def encode(data):
+        raw = json.dumps(data).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    return f"{encode({'alg': 'none'})}.{encode({'exp': time.time() + lifetime})}.sig"
+
+
+def signals_rows(count: int) -> list:
+    start = 1_700_000_000
+    return [
+        {
+            "timestamp": time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + index * 3600)
+            ),
+            "powertrainTransmissionTravelledDistance": 1000.0 + index,
+            "speed": float(index % 120),
+            "powertrainFuelSystemRelativeLevel": float(index % 100),
+        }
+        for index in range(count)
+    ]
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class MockDimoServer:
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        payload_bytes: int = 512,
+        telemetry_rows: int = 100,
+        host: str = "127.0.0.1",
+    ):
+        self.latency = latency
+        self.payload_bytes = payload_bytes
+        self.telemetry_rows = telemetry_rows
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, 0), self._handler())
+        self._thread = None
+        self._cache = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # DIMO.urls pointing every service at this server
+    def urls(self) -> dict:
+        return {service: f"{self.base_url}/{service.lower()}" for service in SERVICES}
+
+    def start(self) -> "MockDimoServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _padding(self) -> str:
+        return "x" * max(self.payload_bytes - 64, 0)
+
+    # Bodies that do not depend on the request are built once per process
+    def _static(self, key, build) -> bytes:
+        body = self._cache.get(key)
+        if body is None:
+            body = self._cache[key] = json.dumps(build()).encode()
+        return body
+
+    def respond(self, method: str, path: str, body: bytes) -> bytes:
+        service, _, rest = path.lstrip("/").partition("/")
+        rest = "/" + rest.split("?", 1)[0]
+        if service == "auth" and rest.endswith("generate_challenge"):
+            return json.dumps({"challenge": "sign me", "state": "state"}).encode()
+        if service == "auth":
+            return json.dumps({"access_token": fake_jwt()}).encode()
+        if service == "tokenexchange":
+            return json.dumps({"token": fake_jwt()}).encode()
+        if service == "telemetry":
+            return self._static(
+                ("telemetry", self.telemetry_rows),
+                lambda: {"data": {"signals": signals_rows(self.telemetry_rows)}},
+            )
+        if service == "identity":
+            return self._static(
+                "identity",
+                lambda: {
+                    "data": {
+                        "vehicle": {
+                            "definition": {
+                                "make": "Lexus",
+                                "model": "GX",
+                                "year": 2023,
+                            },
+                            "sacds": {
+                                "nodes": [
+                                    {"grantee": "0xclient", "permissions": "0xfc"}
+                                ]
+                            },
+                            "padding": self._padding(),
+                        }
+                    }
+                },
+            )
+        if service == "trips":
+            return self._static(
+                "trips",
+                lambda: {
+                    "trips": [
+                        {"id": str(index), "start": {}, "end": {}}
+                        for index in range(10)
+                    ],
+                    "totalPages": 1,
+                    "padding": self._padding(),
+                },
+            )
+        match = re.search(r"/vehicles/(\d+)", rest)
+        return json.dumps(
+            {
+                "tokenId": int(match.group(1)) if match else None,
+                "path": rest,
+                "padding": self._padding(),
+            }
+        ).encode()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; with Nagle on, every
+            # keep-alive response stalls on the client's delayed ACK (~40 ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if server.latency:
+                    time.sleep(server.latency)
+                payload = server.respond(self.command, self.path, body)
+                with server._lock:
+                    server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _reply
+
+        return Handler
@@ -0,0 +1,286 @@
+# Offline benchmark suite for the DIMO SDK. Starts MockDimoServer locally and measures
+# calls/sec, p50/p99 latency and peak Python memory for each module method, used
+# sequentially (sync), from a thread pool (threaded) and from asyncio (async), plus
+# large Telemetry payloads. Results are written as JSON so runs can be compared
+# between releases:
+#
+#     python benchmarks/run.py --output results.json
+#     python benchmarks/run.py --latency-ms 20 --compare results.json
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockDimoServer  # noqa: E402
+
+from dimo import DIMO, HTTPXTransport, Urllib3Transport  # noqa: E402
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+CLIENT_ID = "0xclient"
+PRIVATE_KEY = "0x" + "11" * 32
+SIGNALS_QUERY = """
+query Signals($tokenId: Int!) {
+  signals(tokenId: $tokenId, interval: "1h", from: "2024-01-01T00:00:00Z", to: "2024-02-01T00:00:00Z") {
+    timestamp
+    powertrainTransmissionTravelledDistance(agg: MAX)
+    speed(agg: MAX)
+    powertrainFuelSystemRelativeLevel(agg: AVG)
+  }
+}
+"""
+
+# name -> fn(dimo, i). Under AsyncDIMO the same calls return awaitables.
+SCENARIOS = {
+    "auth.get_dev_jwt": lambda dimo, i: dimo.auth.get_dev_jwt(
+        CLIENT_ID, "http://localhost", PRIVATE_KEY
+    ),
+    "identity.mmy_by_token_id": lambda dimo, i: dimo.identity.mmy_by_token_id(i),
+    "telemetry.get_signals_latest": lambda dimo, i: dimo.telemetry.get_signals_latest(
+        "vehicle-jwt", i
+    ),
+    "token_exchange.exchange": lambda dimo, i: dimo.token_exchange.exchange(
+        "developer-jwt",
+        token_id=i,
+        client_id=CLIENT_ID,
+        privileges=[1],
+        use_cache=False,
+    ),
+    "trips.trips": lambda dimo, i: dimo.trips.trips("vehicle-jwt", i),
+    "valuations.get_valuations": lambda dimo, i: dimo.valuations.get_valuations(
+        "vehicle-jwt", i
+    ),
+}
+
+# Run against a server returning --large-rows signal rows
+LARGE_SCENARIOS = {
+    "telemetry.query[large,json]": lambda dimo, i: dimo.telemetry.query(
+        SIGNALS_QUERY, "vehicle-jwt"
+    ),
+    "telemetry.query[large,raw]": lambda dimo, i: dimo.telemetry.query(
+        SIGNALS_QUERY, "vehicle-jwt", output="raw"
+    ),
+    "telemetry.query[large,columns]": lambda dimo, i: dimo.telemetry.query(
+        SIGNALS_QUERY, "vehicle-jwt", output="columns"
+    ),
+}
+
+
+# Sync clients go through the backend picked with --transport
+TRANSPORTS = {
+    "requests": lambda workers: None,
+    "urllib3": lambda workers: Urllib3Transport(pool_maxsize=workers),
+    "httpx": lambda workers: HTTPXTransport(
+        limits=httpx.Limits(max_keepalive_connections=workers)
+    ),
+}
+
+
+def _client(urls, mode, workers, transport):
+    if mode == "async":
+        from dimo import AsyncDIMO
+
+        dimo = AsyncDIMO(max_connections=workers, max_keepalive_connections=workers)
+    else:
+        dimo = DIMO(pool_maxsize=workers, transport=TRANSPORTS[transport](workers))
+    dimo.urls = urls
+    return dimo
+
+
+def _timed(fn, dimo, i, latencies):
+    started = time.perf_counter()
+    fn(dimo, i)
+    latencies.append(time.perf_counter() - started)
+
+
+async def _atimed(fn, dimo, i, latencies, limit):
+    async with limit:
+        started = time.perf_counter()
+        await fn(dimo, i)
+        latencies.append(time.perf_counter() - started)
+
+
+# Runs `calls` calls and returns (elapsed seconds, per-call latencies)
+def _drive(fn, urls, mode, calls, workers, transport):
+    latencies = []
+    dimo = _client(urls, mode, workers, transport)
+    if mode == "async":
+
+        async def main():
+            limit = asyncio.Semaphore(workers)
+            async with dimo:
+                await asyncio.gather(
+                    *[_atimed(fn, dimo, i, latencies, limit) for i in range(calls)]
+                )
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return time.perf_counter() - started, latencies
+
+    started = time.perf_counter()
+    if mode == "threaded":
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda i: _timed(fn, dimo, i, latencies), range(calls)))
+    else:
+        for i in range(calls):
+            _timed(fn, dimo, i, latencies)
+    elapsed = time.perf_counter() - started
+    dimo.close()
+    return elapsed, latencies
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run_scenario(name, fn, urls, mode, calls, workers, memory_calls, transport):
+    _drive(fn, urls, mode, min(calls, 5), workers, transport)
+    elapsed, latencies = _drive(fn, urls, mode, calls, workers, transport)
+
+    tracemalloc.start()
+    _drive(fn, urls, mode, memory_calls, workers, transport)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "mode": mode,
+        "transport": "httpx" if mode == "async" else transport,
+        "calls": calls,
+        "workers": 1 if mode == "sync" else workers,
+        "calls_per_sec": round(calls / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def _available_modes(modes):
+    if "async" in modes and httpx is None:
+        print("httpx is not installed, skipping async mode", file=sys.stderr)
+        modes = [mode for mode in modes if mode != "async"]
+    return modes
+
+
+def _skip(name, selected):
+    if name.endswith("[large,columns]"):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            return True
+    return bool(selected) and not any(part in name for part in selected)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as handle:
+        baseline = {
+            (row["scenario"], row["mode"]): row for row in json.load(handle)["results"]
+        }
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        before = baseline.get((row["scenario"], row["mode"]))
+        if before is None:
+            continue
+        throughput = row["calls_per_sec"] / before["calls_per_sec"] - 1
+        p99 = row["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        print(
+            f"  {row['scenario']:<34} {row['mode']:<9} calls/sec {throughput:+7.1%}   p99 {p99:+7.1%}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DIMO SDK offline benchmarks")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--memory-calls", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--payload-bytes", type=int, default=512)
+    parser.add_argument("--telemetry-rows", type=int, default=100)
+    parser.add_argument("--large-rows", type=int, default=20000)
+    parser.add_argument("--large-calls", type=int, default=20)
+    parser.add_argument("--modes", default="sync,threaded,async")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="requests")
+    parser.add_argument(
+        "--scenarios", default="", help="comma separated substrings to select"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args(argv)
+
+    modes = _available_modes(args.modes.split(","))
+    selected = [part for part in args.scenarios.split(",") if part]
+    latency = args.latency_ms / 1000
+    server = MockDimoServer(latency, args.payload_bytes, args.telemetry_rows).start()
+    large = MockDimoServer(latency, args.payload_bytes, args.large_rows).start()
+
+    plan = [(name, fn, server, args.calls) for name, fn in SCENARIOS.items()]
+    plan += [
+        (name, fn, large, args.large_calls) for name, fn in LARGE_SCENARIOS.items()
+    ]
+
+    results = []
+    try:
+        for name, fn, target, calls in plan:
+            if _skip(name, selected):
+                continue
+            for mode in modes:
+                row = run_scenario(
+                    name,
+                    fn,
+                    target.urls(),
+                    mode,
+                    calls,
+                    args.workers,
+                    args.memory_calls,
+                    args.transport,
+                )
+                results.append(row)
+                print(
+                    f"{name:<34} {mode:<9} {row['calls_per_sec']:>10.1f} calls/s"
+                    f"   p50 {row['p50_ms']:>8.2f} ms   p99 {row['p99_ms']:>8.2f} ms"
+                    f"   peak {row['peak_memory_kb']:>9.1f} KiB"
+                )
+    finally:
+        server.stop()
+        large.stop()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "config": vars(args),
+        },
+        "results": results,
+    }
+    try:
+        from importlib.metadata import version
+
+        report["meta"]["sdk_version"] = version("dimo-python-sdk")
+    except Exception:
+        report["meta"]["sdk_version"] = None
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
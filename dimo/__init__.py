@@ -1,3 +1,32 @@
-from .dimo import DIMO
+import importlib
 
-__all__ = ["DIMO"]
+# Submodules are imported on first attribute access (PEP 562), so `import dimo`
+# stays cheap and only the parts of the SDK actually used get loaded
+_LAZY_ATTRIBUTES = {
+    "DIMO": ".dimo",
+    "AsyncDIMO": ".async_dimo",
+    "Transport": ".transport",
+    "TransportResponse": ".transport",
+    "RequestsTransport": ".transport",
+    "HTTPXTransport": ".transport",
+    "Urllib3Transport": ".transport",
+    "MemoryTransport": ".transport",
+    "RecordingTransport": ".transport",
+    "FleetPipeline": ".pipeline",
+    "AsyncFleetPipeline": ".pipeline",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
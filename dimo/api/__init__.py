@@ -1,15 +1,29 @@
-from .auth import Auth
-from .attestation import Attestation
-from .device_definitions import DeviceDefinitions
-from .token_exchange import TokenExchange
-from .trips import Trips
-from .valuations import Valuations
-
-__all__ = [
-    "Auth",
-    "Attestation",
-    "DeviceDefinitions",
-    "TokenExchange",
-    "Trips",
-    "Valuations",
-]
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "Auth": ".auth",
+    "AsyncAuth": ".auth",
+    "Attestation": ".attestation",
+    "DeviceDefinitions": ".device_definitions",
+    "AsyncDeviceDefinitions": ".device_definitions",
+    "TokenExchange": ".token_exchange",
+    "AsyncTokenExchange": ".token_exchange",
+    "Trips": ".trips",
+    "AsyncTrips": ".trips",
+    "Valuations": ".valuations",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
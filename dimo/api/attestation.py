@@ -1,4 +1,5 @@
 from dimo.errors import check_type
+from dimo.routes import ATTESTATION_POM_VC, ATTESTATION_VIN_VC
 
 
 class Attestation:
@@ -10,11 +11,8 @@ class Attestation:
         check_type("vehicle_jwt", vehicle_jwt, str)
         check_type("token_id", token_id, int)
         params = {"force": True}
-        url = f"/v1/vc/vin/{token_id}"
         return self._request(
-            "POST",
-            "Attestation",
-            url,
+            **ATTESTATION_VIN_VC.bind(token_id=token_id),
             params=params,
             headers=self._get_auth_headers(vehicle_jwt),
         )
@@ -22,7 +20,7 @@ class Attestation:
     def create_pom_vc(self, vehicle_jwt: str, token_id: int) -> dict:
         check_type("vehicle_jwt", vehicle_jwt, str)
         check_type("token_id", token_id, int)
-        url = f"/v1/vc/pom/{token_id}"
         return self._request(
-            "POST", "Attestation", url, headers=self._get_auth_headers(vehicle_jwt)
+            **ATTESTATION_POM_VC.bind(token_id=token_id),
+            headers=self._get_auth_headers(vehicle_jwt),
         )
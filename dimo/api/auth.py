@@ -1,16 +1,25 @@
-from dimo.eth_signer import EthSigner
+from dimo.eth_signer import CachedSigner, default_signer
 from dimo.errors import check_type, check_optional_type
+from dimo.routes import AUTH_GENERATE_CHALLENGE, AUTH_SUBMIT_CHALLENGE
 from urllib.parse import urlencode
 from typing import Dict, Optional
 
 
 class Auth:
 
-    def __init__(self, request_method, get_auth_headers, env, dimo_instance):
+    def __init__(
+        self,
+        request_method,
+        get_auth_headers,
+        env,
+        dimo_instance,
+        signer: CachedSigner = None,
+    ):
         self._request = request_method
         self._get_auth_headers = get_auth_headers
         self.env = env
         self._dimo = dimo_instance
+        self.signer = signer if signer is not None else default_signer
 
     def generate_challenge(
         self,
@@ -37,9 +46,7 @@ class Auth:
         }
 
         return self._request(
-            "POST",
-            "Auth",
-            "/auth/web3/generate_challenge",
+            **AUTH_GENERATE_CHALLENGE.bind(),
             data=urlencode(body),
             headers=headers,
         )
@@ -48,7 +55,7 @@ class Auth:
         check_type("message", message, str)
         check_type("private_key", private_key, str)
 
-        return EthSigner.sign_message(message, private_key)
+        return self.signer.sign_message(message, private_key)
 
     def submit_challenge(
         self,
@@ -79,9 +86,7 @@ class Auth:
         encoded_data = urlencode(form_data)
 
         return self._request(
-            "POST",
-            "Auth",
-            "/auth/web3/submit_challenge",
+            **AUTH_SUBMIT_CHALLENGE.bind(),
             data=encoded_data,
             headers=headers,
         )
@@ -128,3 +133,46 @@ class Auth:
 
         submit = self.submit_challenge(client_id, domain, state, signature, headers)
         return submit
+
+
+class AsyncAuth(Auth):
+
+    async def get_dev_jwt(
+        self,
+        client_id: str,
+        domain: str,
+        private_key: str,
+        address: Optional[str] = None,
+        scope="openid email",
+        response_type="code",
+    ) -> Dict:
+
+        check_type("client_id", client_id, str)
+        check_type("domain", domain, str)
+        check_type("private_key", private_key, str)
+        check_optional_type("address", address, str)
+
+        self._dimo._client_id = client_id
+
+        if address is None:
+            address = client_id
+
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        challenge = await self.generate_challenge(
+            headers=headers,
+            client_id=client_id,
+            domain=domain,
+            scope=scope,
+            response_type=response_type,
+            address=address,
+        )
+
+        signature = self.sign_challenge(
+            message=challenge["challenge"],
+            private_key=private_key,
+        )
+
+        return await self.submit_challenge(
+            client_id, domain, challenge["state"], signature, headers
+        )
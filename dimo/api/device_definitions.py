@@ -1,30 +1,110 @@
+from dimo.concurrency import arun_bounded, run_blocking, run_bounded
+from dimo.definition_index import DeviceDefinitionIndex
 from dimo.errors import check_type
 from dimo.errors import check_optional_type
+from dimo.routes import DEVICE_DEFINITIONS_DECODE_VIN, DEVICE_DEFINITIONS_SEARCH
+from dimo.vin_cache import VINCache
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+class VINDecodeResult(NamedTuple):
+    vin: str
+    response: Optional[dict]
+    error: Optional[BaseException]
 
 
 class DeviceDefinitions:
 
-    def __init__(self, request_method, get_auth_headers):
+    def __init__(
+        self,
+        request_method,
+        get_auth_headers,
+        vin_cache: VINCache = None,
+        index: DeviceDefinitionIndex = None,
+    ):
         self._request = request_method
         self._get_auth_headers = get_auth_headers
+        self.vin_cache = vin_cache
+        self.index = index
 
-    def decode_vin(self, developer_jwt: str, country_code: str, vin: str) -> dict:
-        check_type("developer_jwt", developer_jwt, str)
+    # developer_jwt defaults to the one kept by dimo.authenticate(). Decodes are read
+    # from and written to vin_cache when one is configured.
+    def decode_vin(
+        self,
+        developer_jwt: str = None,
+        country_code: str = None,
+        vin: str = None,
+        use_cache: bool = True,
+    ) -> dict:
+        check_optional_type("developer_jwt", developer_jwt, str)
         check_type("country_code", country_code, str)
         check_type("vin", vin, str)
+        if use_cache and self.vin_cache is not None:
+            cached = self.vin_cache.get(country_code, vin)
+            if cached is not None:
+                return cached
+        response = self._decode_vin(
+            self._get_auth_headers(developer_jwt), country_code, vin
+        )
+        if use_cache and self.vin_cache is not None:
+            self.vin_cache.put(country_code, vin, response)
+        return response
+
+    def _decode_vin(self, headers, country_code, vin) -> dict:
         body = {
             "countryCode": country_code,
             "vin": vin,
         }
         response = self._request(
-            "POST",
-            "DeviceDefinitions",
-            "/device-definitions/decode-vin",
-            headers=self._get_auth_headers(developer_jwt),
+            **DEVICE_DEFINITIONS_DECODE_VIN.bind(),
+            headers=dict(headers),
             data=body,
         )
         return response
 
+    # Splits VINs into cached decodes and the misses that still need a request
+    def _partition_vins(self, country_code, vins, use_cache):
+        for vin in vins:
+            check_type("vin", vin, str)
+        if not use_cache or self.vin_cache is None:
+            return {}, vins
+        cached = self.vin_cache.get_many(country_code, vins)
+        hits = {
+            vin: cached[vin.strip().upper()]
+            for vin in vins
+            if vin.strip().upper() in cached
+        }
+        return hits, [vin for vin in dict.fromkeys(vins) if vin not in hits]
+
+    # Decodes many VINs, yielding a VINDecodeResult per VIN. Cached VINs are yielded
+    # first; only the misses are sent, max_workers at a time, and stored in vin_cache.
+    def decode_vins(
+        self,
+        developer_jwt: str = None,
+        country_code: str = None,
+        vins: Iterable[str] = (),
+        max_workers: int = 8,
+        use_cache: bool = True,
+    ) -> Iterator[VINDecodeResult]:
+        check_optional_type("developer_jwt", developer_jwt, str)
+        check_type("country_code", country_code, str)
+        check_type("max_workers", max_workers, int)
+        # Resolve the managed Developer JWT once rather than once per VIN
+        headers = self._get_auth_headers(developer_jwt)
+        hits, misses = self._partition_vins(country_code, list(vins), use_cache)
+        for vin, response in hits.items():
+            yield VINDecodeResult(vin, response, None)
+
+        def decode_one(vin):
+            return self._decode_vin(headers, country_code, vin)
+
+        for outcome in run_bounded(decode_one, misses, max_workers):
+            if outcome.error is None and use_cache and self.vin_cache is not None:
+                self.vin_cache.put(country_code, outcome.item, outcome.result)
+            yield VINDecodeResult(outcome.item, outcome.result, outcome.error)
+
+    # Served from the local index once sync_index has filled it, remotely otherwise.
+    # use_index=False always asks the API.
     def search_device_definitions(
         self,
         query=None,
@@ -33,6 +113,7 @@ class DeviceDefinitions:
         year=None,
         page=None,
         page_size=None,
+        use_index=True,
     ):
         check_optional_type("query", query, str)
         check_optional_type("make_slug", make_slug, str)
@@ -40,6 +121,13 @@ class DeviceDefinitions:
         check_optional_type("year", year, int)
         check_optional_type("page", page, int)
         check_optional_type("page_size", page_size, int)
+        if use_index and self.index is not None and self.index.is_warm:
+            return self._search_index(
+                query, make_slug, model_slug, year, page, page_size
+            )
+        return self._search_remote(query, make_slug, model_slug, year, page, page_size)
+
+    def _search_remote(self, query, make_slug, model_slug, year, page, page_size):
         params = {
             "query": query,
             "makeSlug": make_slug,
@@ -49,9 +137,156 @@ class DeviceDefinitions:
             "pageSize": page_size,
         }
         response = self._request(
-            "GET",
-            "DeviceDefinitions",
-            "/device-definitions/search",
+            **DEVICE_DEFINITIONS_SEARCH.bind(),
             params=params,
         )
         return response
+
+    # Shapes local results like the search endpoint's response
+    def _search_index(self, query, make_slug, model_slug, year, page, page_size):
+        page = page or 1
+        page_size = page_size or 20
+        results = self.index.search(query, make_slug, model_slug, year)
+        start = (page - 1) * page_size
+        return {
+            "deviceDefinitions": results[start : start + page_size],
+            "pagination": {
+                "page": page,
+                "pageSize": page_size,
+                "totalItems": len(results),
+                "totalPages": -(-len(results) // page_size),
+            },
+        }
+
+    # Returns the definitions on a search page and whether another page follows
+    def _definitions_page(self, response, page, page_size):
+        response = response or {}
+        definitions = response.get("deviceDefinitions") or []
+        total_pages = (response.get("pagination") or {}).get("totalPages")
+        if total_pages is not None:
+            return definitions, page < total_pages
+        return definitions, len(definitions) == page_size
+
+    # Downloads the catalog page by page into self.index (created on first use). With
+    # make_slug or year only that slice of the index is refreshed. Returns the number
+    # of definitions synced.
+    def sync_index(
+        self, make_slug: str = None, year: int = None, page_size: int = 100
+    ) -> int:
+        check_optional_type("make_slug", make_slug, str)
+        check_optional_type("year", year, int)
+        check_type("page_size", page_size, int)
+        definitions = []
+        page = 1
+        while True:
+            response = self._search_remote(None, make_slug, None, year, page, page_size)
+            items, has_more = self._definitions_page(response, page, page_size)
+            definitions.extend(items)
+            if not has_more or not items:
+                break
+            page += 1
+        return self._update_index(definitions, make_slug, year)
+
+    def _update_index(self, definitions, make_slug, year) -> int:
+        if self.index is None:
+            self.index = DeviceDefinitionIndex()
+        return self.index.update(
+            definitions, replace=True, make_slug=make_slug, year=year
+        )
+
+
+# The VIN cache and the definition index are synchronous, so their SQLite reads and
+# writes, searches and rebuilds run on the event loop's default executor
+class AsyncDeviceDefinitions(DeviceDefinitions):
+
+    async def decode_vin(
+        self,
+        developer_jwt: str = None,
+        country_code: str = None,
+        vin: str = None,
+        use_cache: bool = True,
+    ) -> dict:
+        check_optional_type("developer_jwt", developer_jwt, str)
+        check_type("country_code", country_code, str)
+        check_type("vin", vin, str)
+        if use_cache and self.vin_cache is not None:
+            cached = await run_blocking(self.vin_cache.get, country_code, vin)
+            if cached is not None:
+                return cached
+        response = await self._decode_vin(
+            self._get_auth_headers(developer_jwt), country_code, vin
+        )
+        if use_cache and self.vin_cache is not None:
+            await run_blocking(self.vin_cache.put, country_code, vin, response)
+        return response
+
+    async def decode_vins(
+        self,
+        developer_jwt: str = None,
+        country_code: str = None,
+        vins: Iterable[str] = (),
+        max_workers: int = 8,
+        use_cache: bool = True,
+    ):
+        check_optional_type("developer_jwt", developer_jwt, str)
+        check_type("country_code", country_code, str)
+        check_type("max_workers", max_workers, int)
+        headers = self._get_auth_headers(developer_jwt)
+        hits, misses = await run_blocking(
+            self._partition_vins, country_code, list(vins), use_cache
+        )
+        for vin, response in hits.items():
+            yield VINDecodeResult(vin, response, None)
+
+        def decode_one(vin):
+            return self._decode_vin(headers, country_code, vin)
+
+        async for outcome in arun_bounded(decode_one, misses, max_workers):
+            if outcome.error is None and use_cache and self.vin_cache is not None:
+                await run_blocking(
+                    self.vin_cache.put, country_code, outcome.item, outcome.result
+                )
+            yield VINDecodeResult(outcome.item, outcome.result, outcome.error)
+
+    async def search_device_definitions(
+        self,
+        query=None,
+        make_slug=None,
+        model_slug=None,
+        year=None,
+        page=None,
+        page_size=None,
+        use_index=True,
+    ):
+        check_optional_type("query", query, str)
+        check_optional_type("make_slug", make_slug, str)
+        check_optional_type("model_slug", model_slug, str)
+        check_optional_type("year", year, int)
+        check_optional_type("page", page, int)
+        check_optional_type("page_size", page_size, int)
+        if use_index and self.index is not None and self.index.is_warm:
+            return await run_blocking(
+                self._search_index, query, make_slug, model_slug, year, page, page_size
+            )
+        return await self._search_remote(
+            query, make_slug, model_slug, year, page, page_size
+        )
+
+    async def sync_index(
+        self, make_slug: str = None, year: int = None, page_size: int = 100
+    ) -> int:
+        check_optional_type("make_slug", make_slug, str)
+        check_optional_type("year", year, int)
+        check_type("page_size", page_size, int)
+        definitions = []
+        page = 1
+        while True:
+            response = await self._search_remote(
+                None, make_slug, None, year, page, page_size
+            )
+            items, has_more = self._definitions_page(response, page, page_size)
+            definitions.extend(items)
+            if not has_more or not items:
+                break
+            page += 1
+        return await run_blocking(self._update_index, definitions, make_slug, year)
@@ -1,28 +1,57 @@
+from dimo.concurrency import arun_bounded, run_bounded
 from dimo.constants import dimo_constants
 from dimo.errors import check_type, check_optional_type
+from dimo.graphql.batch import VehicleBatch
 from dimo.permission_decoder import PermissionDecoder
+from dimo.routes import TOKEN_EXCHANGE
+from dimo.token_cache import VehicleJWTCache
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+class ExchangeResult(NamedTuple):
+    token_id: int
+    response: Optional[dict]
+    error: Optional[BaseException]
 
 
 class TokenExchange:
 
     def __init__(
-        self, request_method, get_auth_headers, identity_instance, dimo_instance
+        self,
+        request_method,
+        get_auth_headers,
+        identity_instance,
+        dimo_instance,
+        cache: VehicleJWTCache = None,
     ):
         self._request = request_method
         self._get_auth_headers = get_auth_headers
         self._identity = identity_instance
         self._dimo = dimo_instance
         self._permission_decoder = PermissionDecoder()
+        self.cache = cache if cache is not None else self._create_cache()
+
+    def _create_cache(self) -> VehicleJWTCache:
+        return VehicleJWTCache()
+
+    # Cache key for a vehicle JWT. privileges=None means "whatever the vehicle granted".
+    def _cache_key(self, client_id: str, token_id: int, privileges, env: str):
+        privileges = tuple(privileges) if privileges is not None else None
+        return (client_id.lower(), token_id, privileges, env)
 
     def _decode_vehicle_permissions(self, token_id: int, client_id: str) -> dict:
         response = self._identity.check_vehicle_privileges(token_id)
+        return self._filter_vehicle_permissions(response, client_id)
+
+    # Picks the SACD granted to client_id out of a privileges response and decodes it
+    def _filter_vehicle_permissions(self, response: dict, client_id: str) -> list:
+        return self._decode_sacds(
+            response.get("data", {}).get("vehicle", {}), client_id
+        )
+
+    def _decode_sacds(self, vehicle: dict, client_id: str) -> list:
         try:
-            nodes = (
-                response.get("data", {})
-                .get("vehicle", {})
-                .get("sacds", {})
-                .get("nodes", [])
-            )
+            nodes = (vehicle or {}).get("sacds", {}).get("nodes", [])
             if not nodes or not isinstance(nodes, list):
                 raise ValueError("Invalid response from server")
             filtered_sacd = next(
@@ -47,39 +76,342 @@ class TokenExchange:
         except Exception as e:
             raise ValueError(f"Failed to decode permissions: {str(e)}")
 
-    def exchange(
-        self,
-        developer_jwt: str,
-        token_id: int,
-        client_id: str = None,
-        env: str = "Production",
-        privileges: list = None,
+    # Looks up the privileges many vehicles granted to client_id using batched Identity
+    # queries. Returns {token_id: privileges}; vehicles not shared with client_id are omitted
+    # and vehicles the lookup failed for are in .errors.
+    def decode_vehicles_permissions(
+        self, token_ids: list, client_id: str = None, chunk_size: int = 50
     ) -> dict:
+        client_id = self._resolve_client_id(client_id)
+        vehicles = self._identity.check_vehicles_privileges(token_ids, chunk_size)
+        return self._decode_vehicles(vehicles, client_id)
 
+    def _decode_vehicles(self, vehicles: VehicleBatch, client_id: str) -> VehicleBatch:
+        privileges = VehicleBatch()
+        privileges.errors.update(getattr(vehicles, "errors", {}))
+        for token_id, vehicle in vehicles.items():
+            try:
+                privileges[token_id] = self._decode_sacds(vehicle, client_id)
+            except ValueError:
+                continue
+        return privileges
+
+    def _missing_permissions_error(self, client_id: str) -> ValueError:
+        return ValueError(
+            f"Failed to decode permissions: No permissions found for developer license: {client_id}. "
+            "Has this vehicle been shared?"
+        )
+
+    # Yields (token_id, granted privileges or error) pairs, resolving a chunk of
+    # uncached vehicles with one Identity request at a time
+    def _with_granted_privileges(
+        self, token_ids, client_id, env, chunk_size, use_cache
+    ):
+        for chunk in self._chunks(token_ids, chunk_size):
+            lookup = [
+                token_id
+                for token_id in chunk
+                if not use_cache or not self._is_cached(client_id, token_id, env)
+            ]
+            try:
+                granted = self.decode_vehicles_permissions(
+                    lookup, client_id, chunk_size
+                )
+            except Exception as e:
+                granted = e
+            yield from self._pair_granted(chunk, lookup, granted, client_id)
+
+    def _is_cached(self, client_id: str, token_id: int, env: str) -> bool:
+        key = self._cache_key(client_id, token_id, None, env)
+        return self.cache.get(key) is not None
+
+    # Validates every token id before any request is sent, so a bad id cannot stop a
+    # batch half way through
+    def _check_token_ids(self, token_ids: Iterable[int]) -> list:
+        token_ids = list(token_ids)
+        for token_id in token_ids:
+            check_type("token_id", token_id, int)
+        return token_ids
+
+    def _chunks(self, token_ids, chunk_size: int):
+        chunk = []
+        for token_id in token_ids:
+            chunk.append(token_id)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _pair_granted(self, chunk, lookup, granted, client_id):
+        lookup = set(lookup)
+        for token_id in chunk:
+            if token_id not in lookup:
+                yield token_id, None
+            elif isinstance(granted, Exception):
+                yield token_id, granted
+            elif token_id in granted.errors:
+                yield token_id, granted.errors[token_id]
+            elif token_id in granted:
+                yield token_id, granted[token_id]
+            else:
+                yield token_id, self._missing_permissions_error(client_id)
+
+    def _resolve_client_id(self, client_id):
         if client_id is None:
             client_id = self._dimo._client_id
             if not client_id:
                 raise ValueError(
                     "No client_id found. Please make sure you've obtained a Developer JWT before calling token exchange."
                 )
+        return client_id
+
+    def _exchange_body(self, token_id: int, env: str, privileges: list) -> dict:
+        return {
+            "nftContractAddress": dimo_constants[env]["NFT_address"],
+            "privileges": privileges,
+            "tokenId": token_id,
+        }
+
+    def exchange(
+        self,
+        developer_jwt: str = None,
+        token_id: int = None,
+        client_id: str = None,
+        env: str = "Production",
+        privileges: list = None,
+        use_cache: bool = True,
+    ) -> dict:
+
+        if developer_jwt is None:
+            developer_jwt = self._dimo._get_developer_jwt()
+        client_id = self._resolve_client_id(client_id)
         check_type("developer_jwt", developer_jwt, str)
         check_optional_type("privileges", privileges, list)
         check_type("token_id", token_id, int)
         check_type("client_id", client_id, str)
 
+        return self._exchange_cached(
+            developer_jwt, token_id, client_id, env, privileges, use_cache
+        )
+
+    # granted holds privileges already looked up for this vehicle, used when privileges is None
+    def _exchange_cached(
+        self,
+        developer_jwt,
+        token_id,
+        client_id,
+        env,
+        privileges,
+        use_cache,
+        granted=None,
+    ) -> dict:
+        effective = privileges if privileges is not None else granted
+        if not use_cache:
+            return self._exchange(developer_jwt, token_id, client_id, env, effective)
+
+        key = self._cache_key(client_id, token_id, privileges, env)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with self.cache.key_lock(key):
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            response = self._exchange(
+                developer_jwt, token_id, client_id, env, effective
+            )
+            self.cache.put(key, response)
+            return response
+
+    def _exchange(self, developer_jwt, token_id, client_id, env, privileges) -> dict:
         if privileges is None:
             privileges = self._decode_vehicle_permissions(token_id, client_id)
 
-        body = {
-            "nftContractAddress": dimo_constants[env]["NFT_address"],
-            "privileges": privileges,
-            "tokenId": token_id,
-        }
+        body = self._exchange_body(token_id, env, privileges)
         response = self._request(
-            "POST",
-            "TokenExchange",
-            "/v1/tokens/exchange",
+            **TOKEN_EXCHANGE.bind(),
             headers=self._get_auth_headers(developer_jwt),
             data=body,
         )
         return response
+
+    # Exchanges tokens for many vehicles in parallel, yielding an ExchangeResult per
+    # vehicle as it completes. A failing vehicle is reported on its result instead of
+    # aborting the batch.
+    def exchange_many(
+        self,
+        developer_jwt: str = None,
+        token_ids: Iterable[int] = (),
+        client_id: str = None,
+        env: str = "Production",
+        privileges: list = None,
+        max_workers: int = 16,
+        use_cache: bool = True,
+        chunk_size: int = 50,
+    ) -> Iterator[ExchangeResult]:
+        if developer_jwt is None:
+            developer_jwt = self._dimo._get_developer_jwt()
+        client_id = self._resolve_client_id(client_id)
+        check_type("developer_jwt", developer_jwt, str)
+        check_optional_type("privileges", privileges, list)
+        check_type("max_workers", max_workers, int)
+        check_type("chunk_size", chunk_size, int)
+        token_ids = self._check_token_ids(token_ids)
+
+        if privileges is None:
+            items = self._with_granted_privileges(
+                token_ids, client_id, env, chunk_size, use_cache
+            )
+        else:
+            items = ((token_id, None) for token_id in token_ids)
+
+        def exchange_one(item):
+            token_id, granted = item
+            if isinstance(granted, Exception):
+                raise granted
+            return self._exchange_cached(
+                developer_jwt, token_id, client_id, env, privileges, use_cache, granted
+            )
+
+        for outcome in run_bounded(exchange_one, items, max_workers):
+            yield ExchangeResult(outcome.item[0], outcome.result, outcome.error)
+
+
+class AsyncTokenExchange(TokenExchange):
+
+    def _create_cache(self) -> VehicleJWTCache:
+        import asyncio
+
+        return VehicleJWTCache(lock_factory=asyncio.Lock)
+
+    async def _decode_vehicle_permissions(self, token_id: int, client_id: str) -> dict:
+        response = await self._identity.check_vehicle_privileges(token_id)
+        return self._filter_vehicle_permissions(response, client_id)
+
+    async def exchange(
+        self,
+        developer_jwt: str = None,
+        token_id: int = None,
+        client_id: str = None,
+        env: str = "Production",
+        privileges: list = None,
+        use_cache: bool = True,
+    ) -> dict:
+
+        if developer_jwt is None:
+            developer_jwt = self._dimo._get_developer_jwt()
+        client_id = self._resolve_client_id(client_id)
+        check_type("developer_jwt", developer_jwt, str)
+        check_optional_type("privileges", privileges, list)
+        check_type("token_id", token_id, int)
+        check_type("client_id", client_id, str)
+
+        return await self._exchange_cached(
+            developer_jwt, token_id, client_id, env, privileges, use_cache
+        )
+
+    async def _exchange_cached(
+        self,
+        developer_jwt,
+        token_id,
+        client_id,
+        env,
+        privileges,
+        use_cache,
+        granted=None,
+    ) -> dict:
+        effective = privileges if privileges is not None else granted
+        if not use_cache:
+            return await self._exchange(
+                developer_jwt, token_id, client_id, env, effective
+            )
+
+        key = self._cache_key(client_id, token_id, privileges, env)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        async with self.cache.key_lock(key):
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            response = await self._exchange(
+                developer_jwt, token_id, client_id, env, effective
+            )
+            self.cache.put(key, response)
+            return response
+
+    async def _exchange(self, developer_jwt, token_id, client_id, env, privileges):
+        if privileges is None:
+            privileges = await self._decode_vehicle_permissions(token_id, client_id)
+
+        body = self._exchange_body(token_id, env, privileges)
+        return await self._request(
+            **TOKEN_EXCHANGE.bind(),
+            headers=self._get_auth_headers(developer_jwt),
+            data=body,
+        )
+
+    async def decode_vehicles_permissions(
+        self, token_ids: list, client_id: str = None, chunk_size: int = 50
+    ) -> dict:
+        client_id = self._resolve_client_id(client_id)
+        vehicles = await self._identity.check_vehicles_privileges(token_ids, chunk_size)
+        return self._decode_vehicles(vehicles, client_id)
+
+    async def _with_granted_privileges(
+        self, token_ids, client_id, env, chunk_size, use_cache
+    ):
+        for chunk in self._chunks(token_ids, chunk_size):
+            lookup = [
+                token_id
+                for token_id in chunk
+                if not use_cache or not self._is_cached(client_id, token_id, env)
+            ]
+            try:
+                granted = await self.decode_vehicles_permissions(
+                    lookup, client_id, chunk_size
+                )
+            except Exception as e:
+                granted = e
+            for pair in self._pair_granted(chunk, lookup, granted, client_id):
+                yield pair
+
+    # Async generator counterpart of TokenExchange.exchange_many
+    async def exchange_many(
+        self,
+        developer_jwt: str = None,
+        token_ids: Iterable[int] = (),
+        client_id: str = None,
+        env: str = "Production",
+        privileges: list = None,
+        max_workers: int = 64,
+        use_cache: bool = True,
+        chunk_size: int = 50,
+    ):
+        if developer_jwt is None:
+            developer_jwt = self._dimo._get_developer_jwt()
+        client_id = self._resolve_client_id(client_id)
+        check_type("developer_jwt", developer_jwt, str)
+        check_optional_type("privileges", privileges, list)
+        check_type("max_workers", max_workers, int)
+        check_type("chunk_size", chunk_size, int)
+        token_ids = self._check_token_ids(token_ids)
+
+        if privileges is None:
+            items = self._with_granted_privileges(
+                token_ids, client_id, env, chunk_size, use_cache
+            )
+        else:
+            items = ((token_id, None) for token_id in token_ids)
+
+        async def exchange_one(item):
+            token_id, granted = item
+            if isinstance(granted, Exception):
+                raise granted
+            return await self._exchange_cached(
+                developer_jwt, token_id, client_id, env, privileges, use_cache, granted
+            )
+
+        async for outcome in arun_bounded(exchange_one, items, max_workers):
+            yield ExchangeResult(outcome.item[0], outcome.result, outcome.error)
@@ -1,4 +1,15 @@
+from dimo.concurrency import amerge_iterators, merge_iterators
 from dimo.errors import check_type
+from dimo.routes import TRIPS
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Iterator, NamedTuple, Optional
+
+
+class FleetTrip(NamedTuple):
+    token_id: int
+    trip: Optional[dict]
+    error: Optional[BaseException]
 
 
 class Trips:
@@ -13,11 +24,149 @@ class Trips:
         params = {}
         if page is not None:
             params["page"] = [page]
-        url = f"/v1/vehicle/{token_id}/trips"
         return self._request(
-            "GET",
-            "Trips",
-            url,
+            **TRIPS.bind(token_id=token_id),
             params=params,
             headers=self._get_auth_headers(vehicle_jwt),
         )
+
+    # Returns the trips of a page response, whether a later page exists and the
+    # total page count when the server reports one
+    def _read_page(self, response: dict, page: int):
+        response = response or {}
+        trips = response.get("trips") or []
+        total_pages = response.get("totalPages")
+        if total_pages is None:
+            return trips, bool(trips), None
+        return trips, page < total_pages, total_pages
+
+    # Streams every trip of a vehicle, page by page. Up to prefetch pages are
+    # requested ahead of the consumer and iteration stops after the last page.
+    def iter_trips(
+        self, vehicle_jwt: str, token_id: int, prefetch: int = 2, start_page: int = 1
+    ) -> Iterator[dict]:
+        check_type("vehicle_jwt", vehicle_jwt, str)
+        check_type("token_id", token_id, int)
+        check_type("prefetch", prefetch, int)
+        check_type("start_page", start_page, int)
+
+        with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as executor:
+            in_flight = deque()
+            next_page = start_page
+            try:
+                page, response = next_page, self.trips(
+                    vehicle_jwt, token_id, page=next_page
+                )
+                next_page += 1
+                while True:
+                    trips, has_more, total_pages = self._read_page(response, page)
+                    if not has_more:
+                        yield from trips
+                        return
+                    while len(in_flight) < prefetch and (
+                        total_pages is None or next_page <= total_pages
+                    ):
+                        in_flight.append(
+                            (
+                                next_page,
+                                executor.submit(
+                                    self.trips, vehicle_jwt, token_id, next_page
+                                ),
+                            )
+                        )
+                        next_page += 1
+                    yield from trips
+                    if in_flight:
+                        page, future = in_flight.popleft()
+                        response = future.result()
+                    else:
+                        page, response = next_page, self.trips(
+                            vehicle_jwt, token_id, page=next_page
+                        )
+                        next_page += 1
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
+
+    # Streams the trips of many (vehicle_jwt, token_id) pairs as FleetTrip records.
+    # Up to max_workers vehicles are read concurrently and at most buffer_size trips
+    # wait for the consumer. A failing vehicle yields a record with its error.
+    def iter_fleet_trips(
+        self, vehicles: list, max_workers: int = 8, buffer_size: int = 256
+    ) -> Iterator[FleetTrip]:
+        check_type("max_workers", max_workers, int)
+
+        def vehicle_trips(vehicle):
+            vehicle_jwt, token_id = vehicle
+            return self.iter_trips(vehicle_jwt, token_id, prefetch=1)
+
+        for outcome in merge_iterators(
+            vehicle_trips, vehicles, max_workers, buffer_size
+        ):
+            yield FleetTrip(outcome.item[1], outcome.result, outcome.error)
+
+
+class AsyncTrips(Trips):
+
+    async def iter_trips(
+        self, vehicle_jwt: str, token_id: int, prefetch: int = 2, start_page: int = 1
+    ):
+        import asyncio
+
+        check_type("vehicle_jwt", vehicle_jwt, str)
+        check_type("token_id", token_id, int)
+        check_type("prefetch", prefetch, int)
+        check_type("start_page", start_page, int)
+
+        in_flight = deque()
+        next_page = start_page
+        try:
+            page, response = next_page, await self.trips(
+                vehicle_jwt, token_id, page=next_page
+            )
+            next_page += 1
+            while True:
+                trips, has_more, total_pages = self._read_page(response, page)
+                if not has_more:
+                    for trip in trips:
+                        yield trip
+                    return
+                while len(in_flight) < prefetch and (
+                    total_pages is None or next_page <= total_pages
+                ):
+                    in_flight.append(
+                        (
+                            next_page,
+                            asyncio.ensure_future(
+                                self.trips(vehicle_jwt, token_id, page=next_page)
+                            ),
+                        )
+                    )
+                    next_page += 1
+                for trip in trips:
+                    yield trip
+                if in_flight:
+                    page, task = in_flight.popleft()
+                    response = await task
+                else:
+                    page, response = next_page, await self.trips(
+                        vehicle_jwt, token_id, page=next_page
+                    )
+                    next_page += 1
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+    async def iter_fleet_trips(
+        self, vehicles: list, max_workers: int = 32, buffer_size: int = 256
+    ):
+        check_type("max_workers", max_workers, int)
+
+        def vehicle_trips(vehicle):
+            vehicle_jwt, token_id = vehicle
+            return self.iter_trips(vehicle_jwt, token_id, prefetch=1)
+
+        async for outcome in amerge_iterators(
+            vehicle_trips, vehicles, max_workers, buffer_size
+        ):
+            yield FleetTrip(outcome.item[1], outcome.result, outcome.error)
@@ -1,4 +1,5 @@
 from dimo.errors import check_type
+from dimo.routes import VALUATIONS, VALUATIONS_INSTANT_OFFER, VALUATIONS_OFFERS
 
 
 class Valuations:
@@ -10,23 +11,23 @@ class Valuations:
     def get_valuations(self, vehicle_jwt: str, token_id: int) -> dict:
         check_type("vehicle_jwt", vehicle_jwt, str)
         check_type("token_id", token_id, int)
-        url = f"/v2/vehicles/{token_id}/valuations"
         return self._request(
-            "GET", "Valuations", url, headers=self._get_auth_headers(vehicle_jwt)
+            **VALUATIONS.bind(token_id=token_id),
+            headers=self._get_auth_headers(vehicle_jwt),
         )
 
     def offers_lookup(self, vehicle_jwt: str, token_id: int) -> None:
         check_type("vehicle_jwt", vehicle_jwt, str)
         check_type("token_id", token_id, int)
-        url = f"v2/vehicles/{token_id}/instant-offer"
         return self._request(
-            "GET", "Valuations", url, headers=self._get_auth_headers(vehicle_jwt)
+            **VALUATIONS_INSTANT_OFFER.bind(token_id=token_id),
+            headers=self._get_auth_headers(vehicle_jwt),
         )
 
     def list_vehicle_offers(self, vehicle_jwt: str, token_id: int) -> dict:
         check_type("vehicle_jwt", vehicle_jwt, str)
         check_type("token_id", token_id, int)
-        url = f"/v2/vehicles/{token_id}/offers"
         return self._request(
-            "GET", "Valuations", url, headers=self._get_auth_headers(vehicle_jwt)
+            **VALUATIONS_OFFERS.bind(token_id=token_id),
+            headers=self._get_auth_headers(vehicle_jwt),
         )
@@ -0,0 +1,133 @@
+from .api.auth import AsyncAuth
+from .api.device_definitions import AsyncDeviceDefinitions
+from .api.token_exchange import AsyncTokenExchange
+from .api.trips import AsyncTrips
+
+from .graphql.identity import AsyncIdentity
+from .graphql.telemetry import AsyncTelemetry
+
+from .async_request import AsyncRequest, create_async_client
+from .credentials import AsyncDeveloperJWTManager
+from .definition_index import DeviceDefinitionIndex
+from .dimo import DIMO
+from .pipeline import AsyncFleetPipeline
+from .response_cache import ResponseCache
+from .retry import RetryPolicy
+from .vin_cache import VINCache
+
+
+# asyncio counterpart of DIMO. Every module method returns an awaitable, and all
+# calls share one pooled keep-alive httpx.AsyncClient owned by this instance.
+# transport may be an httpx async transport or an in-memory dimo.transport backend.
+class AsyncDIMO(DIMO):
+
+    _auth_module = AsyncAuth
+    _device_definitions_module = AsyncDeviceDefinitions
+    _identity_module = AsyncIdentity
+    _token_exchange_module = AsyncTokenExchange
+    _trips_module = AsyncTrips
+    _telemetry_module = AsyncTelemetry
+
+    def __init__(
+        self,
+        env="Production",
+        max_connections=100,
+        max_keepalive_connections=20,
+        keepalive_expiry=30.0,
+        timeout=30.0,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker_threshold: int = 5,
+        circuit_breaker_timeout: float = 30.0,
+        rate_limits: dict = None,
+        hooks: list = None,
+        http2: bool = False,
+        json_codec="auto",
+        cache: ResponseCache = None,
+        vin_cache: VINCache = None,
+        definition_index: DeviceDefinitionIndex = None,
+        transport=None,
+    ):
+        self._configure(
+            env,
+            retry_policy,
+            circuit_breaker_threshold,
+            circuit_breaker_timeout,
+            rate_limits,
+            hooks,
+            json_codec,
+            cache,
+        )
+        self.transport = create_async_client(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout,
+            http2=http2,
+            transport=transport,
+        )
+        self._create_modules(vin_cache, definition_index)
+
+    # request method for HTTP requests for the REST API, returns a coroutine
+    def request(
+        self,
+        http_method,
+        service,
+        path,
+        idempotent=None,
+        endpoint=None,
+        raw=False,
+        cacheable=None,
+        **kwargs,
+    ):
+        full_path = self._get_full_path(service, path)
+        options = self._request_options(service, idempotent, endpoint, cacheable)
+        return AsyncRequest(http_method, full_path, self.transport, raw=raw, **options)(
+            **kwargs
+        )
+
+    # Fetches a Developer JWT and keeps it refreshed from a background task
+    async def authenticate(
+        self,
+        client_id: str,
+        domain: str,
+        private_key: str,
+        address: str = None,
+        refresh_margin: float = 300.0,
+    ) -> AsyncDeveloperJWTManager:
+        if self.credentials is not None:
+            self.credentials.stop()
+        self.credentials = AsyncDeveloperJWTManager(
+            self.auth,
+            client_id,
+            domain,
+            private_key,
+            address=address,
+            refresh_margin=refresh_margin,
+        )
+        await self.credentials.start()
+        return self.credentials
+
+    def fleet_pipeline(self, service_limits: dict = None) -> AsyncFleetPipeline:
+        return AsyncFleetPipeline(self, service_limits)
+
+    # Closes the pooled connections held by this client
+    async def aclose(self):
+        if self.credentials is not None:
+            self.credentials.stop()
+        await self.transport.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    # The pooled httpx.AsyncClient can only be closed from the event loop
+    def close(self):
+        raise TypeError("AsyncDIMO must be closed with 'await dimo.aclose()'")
+
+    def __enter__(self):
+        raise TypeError("AsyncDIMO is used with 'async with', not 'with'")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        raise TypeError("AsyncDIMO is used with 'async with', not 'with'")
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from .request import Request
+
+
+class AsyncRequest(Request):
+
+    def __init__(self, http_method, url, client, **kwargs):
+        super().__init__(http_method, url, session=client, **kwargs)
+        self.client = client
+
+    def _is_transport_error(self, error):
+        import httpx
+
+        return isinstance(error, httpx.TransportError)
+
+    async def _send(self, headers, data, params, kwargs):
+        # httpx sends None-valued params as empty strings, requests drops them
+        if params:
+            params = {key: value for key, value in params.items() if value is not None}
+
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_call()
+            if self.rate_limit is not None:
+                await self.rate_limit.acquire_async()
+            try:
+                response = await self.client.request(
+                    method=self.http_method,
+                    url=self.url,
+                    headers=headers,
+                    params=params,
+                    content=data,
+                    **kwargs,
+                )
+            except Exception as e:
+                delay = self._retry_error_delay(e, self.retries)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_response_delay(response, self.retries)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+            self.retries += 1
+
+    async def __call__(self, headers=None, data=None, params=None, **kwargs):
+        headers, data = self._prepare(headers, data, kwargs)
+        started = time.perf_counter()
+        headers, cached = self._lookup_cache(headers, params, data)
+        if cached is not None:
+            return self._cached_result(started, data, cached)
+
+        if not self.hooks:
+            return self._parse(await self._send(headers, data, params, kwargs))
+
+        response = decode_time = error = None
+        try:
+            response = await self._send(headers, data, params, kwargs)
+            decode_started = time.perf_counter()
+            result = self._parse(response)
+            decode_time = time.perf_counter() - decode_started
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit(started, data, response, decode_time, error)
+
+
+def create_async_client(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+    timeout=30.0,
+    http2=False,
+    transport=None,
+):
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError(
+            "AsyncDIMO requires httpx. Install it with: pip install 'dimo-python-sdk[async]'"
+        ) from e
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    if isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    if transport is not None and not isinstance(transport, httpx.AsyncBaseTransport):
+        from .transport import async_transport
+
+        transport = async_transport(transport)
+    return httpx.AsyncClient(
+        limits=limits, timeout=timeout, http2=http2, transport=transport
+    )
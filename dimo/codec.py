@@ -0,0 +1,91 @@
+import json
+from typing import Union
+
+from dimo.errors import DimoValueError
+
+
+# A codec turns request bodies into str/bytes and response bytes back into Python
+# objects. Any object with the same dumps/loads methods can be passed to DIMO.
+class StdlibCodec:
+
+    name = "json"
+
+    def dumps(self, obj) -> Union[str, bytes]:
+        return json.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]):
+        return self._orjson.loads(data)
+
+
+class UjsonCodec:
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+
+    def dumps(self, obj) -> str:
+        return self._ujson.dumps(obj, ensure_ascii=False)
+
+    def loads(self, data: Union[str, bytes]):
+        return self._ujson.loads(data)
+
+
+CODECS = {
+    "orjson": OrjsonCodec,
+    "ujson": UjsonCodec,
+    "json": StdlibCodec,
+}
+
+_default_codec = None
+
+
+# Fastest installed codec: orjson, then ujson, then the standard library
+def default_codec():
+    global _default_codec
+    if _default_codec is None:
+        for codec_class in CODECS.values():
+            try:
+                _default_codec = codec_class()
+                break
+            except ImportError:
+                continue
+    return _default_codec
+
+
+# Resolves "auto", a codec name from CODECS, or a codec object
+def get_codec(codec="auto"):
+    if codec is None or codec == "auto":
+        return default_codec()
+    if not isinstance(codec, str):
+        if not (hasattr(codec, "dumps") and hasattr(codec, "loads")):
+            raise DimoValueError("json_codec must define dumps() and loads()")
+        return codec
+    if codec not in CODECS:
+        raise DimoValueError(
+            f"json_codec must be 'auto' or one of {', '.join(CODECS)}, but was {codec!r}"
+        )
+    try:
+        return CODECS[codec]()
+    except ImportError as e:
+        raise ImportError(
+            f"json_codec={codec!r} requires {codec}. Install it with: pip install {codec}"
+        ) from e
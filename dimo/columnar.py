@@ -0,0 +1,95 @@
+from dimo.errors import DimoValueError
+from dimo.time_windows import parse_time
+from typing import Dict, Iterable, List, Optional
+
+OUTPUT_FORMATS = ("json", "columns")
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            "Columnar output requires numpy. Install it with: pip install 'dimo-python-sdk[numpy]'"
+        ) from e
+    return numpy
+
+
+def check_output(output: str) -> None:
+    if output not in OUTPUT_FORMATS:
+        raise DimoValueError(
+            f"output must be one of {', '.join(OUTPUT_FORMATS)}, but was {output!r}"
+        )
+
+
+def _timestamps(np, values: list):
+    # numpy parses naive ISO strings natively; only offsets other than Z need datetime
+    stripped = []
+    for value in values:
+        if value is None:
+            stripped.append("NaT")
+        elif value.endswith("Z"):
+            stripped.append(value[:-1])
+        elif "+" in value[10:] or "-" in value[10:]:
+            stripped.append(parse_time(value).replace(tzinfo=None).isoformat())
+        else:
+            stripped.append(value)
+    return np.array(stripped, dtype="datetime64[ms]")
+
+
+def _values(np, values: list):
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {int, bool} and None not in values and kinds:
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    if kinds <= {int, float}:
+        return np.fromiter(
+            (np.nan if value is None else value for value in values),
+            dtype=np.float64,
+            count=len(values),
+        )
+    return np.array(values, dtype=object)
+
+
+# Converts signals rows ({"timestamp": ..., "<signal>": value}) into column arrays:
+# a datetime64[ms] array for timestamp_field and one array per signal. Numeric
+# signals become int64/float64 arrays (missing values as NaN), anything else an
+# object array. columns limits the arrays that are built, the rows themselves have
+# already been decoded in full.
+def to_columns(
+    rows: Iterable[dict],
+    columns: Optional[List[str]] = None,
+    timestamp_field: str = "timestamp",
+) -> Dict[str, object]:
+    np = _require_numpy()
+    rows = rows if isinstance(rows, list) else list(rows)
+    if columns is None:
+        columns = list(rows[0].keys()) if rows else [timestamp_field]
+    result = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        if column == timestamp_field:
+            result[column] = _timestamps(np, values)
+        else:
+            result[column] = _values(np, values)
+    return result
+
+
+def columns_to_dataframe(columns: Dict[str, object], index: str = "timestamp"):
+    try:
+        import pandas
+    except ImportError as e:
+        raise ImportError(
+            "columns_to_dataframe requires pandas. Install it with: pip install pandas"
+        ) from e
+    frame = pandas.DataFrame(columns)
+    return frame.set_index(index) if index in frame.columns else frame
+
+
+def columns_to_arrow(columns: Dict[str, object]):
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "columns_to_arrow requires pyarrow. Install it with: pip install pyarrow"
+        ) from e
+    return pyarrow.table(columns)
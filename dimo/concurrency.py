@@ -0,0 +1,244 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+
+class Outcome(NamedTuple):
+    item: Any
+    result: Any
+    error: Optional[BaseException]
+
+
+# Runs fn(item) on a thread pool with at most max_workers calls in flight and
+# yields an Outcome per item as soon as it finishes. Items are pulled lazily so
+# very long inputs never sit in memory as pending futures.
+def run_bounded(
+    fn: Callable, items: Iterable, max_workers: int = 16
+) -> Iterator[Outcome]:
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit_next():
+            for item in items:
+                pending[executor.submit(fn, item)] = item
+                return True
+            return False
+
+        for _ in range(max_workers):
+            if not submit_next():
+                break
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    error = future.exception()
+                    result = None if error is not None else future.result()
+                    yield Outcome(item, result, error)
+                    submit_next()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+# asyncio counterpart of run_bounded. coro_fn(item) must return an awaitable and
+# items may be a regular or an async iterable.
+async def arun_bounded(coro_fn: Callable, items, limit: int = 16):
+    import asyncio
+
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    pending = {}
+
+    if hasattr(items, "__aiter__"):
+        async_items = items.__aiter__()
+
+        async def next_item():
+            try:
+                return True, await async_items.__anext__()
+            except StopAsyncIteration:
+                return False, None
+
+    else:
+        sync_items = iter(items)
+
+        async def next_item():
+            for item in sync_items:
+                return True, item
+            return False, None
+
+    async def submit_next():
+        has_item, item = await next_item()
+        if has_item:
+            pending[asyncio.ensure_future(coro_fn(item))] = item
+        return has_item
+
+    for _ in range(limit):
+        if not await submit_next():
+            break
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = pending.pop(task)
+                error = task.exception()
+                result = None if error is not None else task.result()
+                yield Outcome(item, result, error)
+                await submit_next()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+_DONE = object()
+
+
+# Drains the iterables produced by factory(item) for every item on up to max_workers
+# threads and yields (item, value, error) as values arrive. The shared buffer holds at
+# most buffer_size values, so producers block instead of piling results up in memory.
+def merge_iterators(
+    factory: Callable, items: Iterable, max_workers: int = 8, buffer_size: int = 256
+) -> Iterator[Outcome]:
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    items = iter(items)
+    items_lock = threading.Lock()
+    buffer = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                buffer.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            while not stop.is_set():
+                with items_lock:
+                    item = next(items, _DONE)
+                if item is _DONE:
+                    return
+                try:
+                    for value in factory(item):
+                        if not put(Outcome(item, value, None)):
+                            return
+                except Exception as e:
+                    put(Outcome(item, None, e))
+        finally:
+            put(_DONE)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max_workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        running = len(threads)
+        while running:
+            outcome = buffer.get()
+            if outcome is _DONE:
+                running -= 1
+                continue
+            yield outcome
+    finally:
+        stop.set()
+
+
+# asyncio counterpart of merge_iterators, factory(item) must return an async iterable
+async def amerge_iterators(
+    factory: Callable, items: Iterable, max_workers: int = 8, buffer_size: int = 256
+):
+    import asyncio
+
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    items = iter(items)
+    buffer = asyncio.Queue(maxsize=buffer_size)
+
+    async def worker():
+        for item in items:
+            try:
+                async for value in factory(item):
+                    await buffer.put(Outcome(item, value, None))
+            except Exception as e:
+                await buffer.put(Outcome(item, None, e))
+        await buffer.put(_DONE)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(max_workers)]
+    try:
+        running = len(tasks)
+        while running:
+            outcome = await buffer.get()
+            if outcome is _DONE:
+                running -= 1
+                continue
+            yield outcome
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Like map(fn, items) but runs up to max_workers calls ahead on a thread pool.
+# Results are yielded in input order and the first error is raised.
+def map_ordered(fn: Callable, items: Iterable, max_workers: int = 4) -> Iterator:
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        try:
+            for item in items:
+                in_flight.append(executor.submit(fn, item))
+                if len(in_flight) >= max_workers:
+                    break
+            while in_flight:
+                result = in_flight.popleft().result()
+                for item in items:
+                    in_flight.append(executor.submit(fn, item))
+                    break
+                yield result
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+# asyncio counterpart of map_ordered, coro_fn(item) must return an awaitable
+async def amap_ordered(coro_fn: Callable, items: Iterable, limit: int = 4):
+    import asyncio
+
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    items = iter(items)
+    in_flight = deque()
+    try:
+        for item in items:
+            in_flight.append(asyncio.ensure_future(coro_fn(item)))
+            if len(in_flight) >= limit:
+                break
+        while in_flight:
+            result = await in_flight.popleft()
+            for item in items:
+                in_flight.append(asyncio.ensure_future(coro_fn(item)))
+                break
+            yield result
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+# Runs a blocking fn(*args) on the event loop's default executor, for local work such
+# as SQLite reads that would otherwise stall every other task on the loop
+async def run_blocking(fn: Callable, *args):
+    import asyncio
+
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import Optional
+
+from dimo.errors import DimoError, check_type, check_optional_type
+from dimo.token_cache import get_jwt_expiry
+
+
+# Keeps a Developer JWT for one developer license and renews it through
+# Auth.get_dev_jwt on a background timer, refresh_margin seconds before it expires.
+class DeveloperJWTManager:
+
+    def __init__(
+        self,
+        auth,
+        client_id: str,
+        domain: str,
+        private_key: str,
+        address: Optional[str] = None,
+        refresh_margin: float = 300.0,
+        retry_interval: float = 30.0,
+    ):
+        check_type("client_id", client_id, str)
+        check_type("domain", domain, str)
+        check_type("private_key", private_key, str)
+        check_optional_type("address", address, str)
+        self._auth = auth
+        self.client_id = client_id
+        self._domain = domain
+        self._private_key = private_key
+        self._address = address
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._token = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._stopped = False
+
+    def _fetch(self) -> str:
+        response = self._auth.get_dev_jwt(
+            client_id=self.client_id,
+            domain=self._domain,
+            private_key=self._private_key,
+            address=self._address,
+        )
+        return response["access_token"]
+
+    def _is_fresh(self) -> bool:
+        if self._token is None:
+            return False
+        if self._expires_at is None:
+            return True
+        return time.time() < self._expires_at - self.refresh_margin
+
+    def _store(self, token: str) -> None:
+        self._token = token
+        self._expires_at = get_jwt_expiry(token)
+
+    # Returns a usable Developer JWT, fetching one inline only when none is fresh
+    def get_token(self) -> str:
+        if self._is_fresh():
+            return self._token
+        with self._lock:
+            if not self._is_fresh():
+                self._store(self._fetch())
+                self._schedule()
+            return self._token
+
+    def refresh(self) -> str:
+        with self._lock:
+            self._store(self._fetch())
+            self._schedule()
+            return self._token
+
+    def _schedule(self, delay: float = None) -> None:
+        if self._stopped:
+            return
+        if delay is None:
+            if self._expires_at is None:
+                return
+            delay = max(self._expires_at - self.refresh_margin - time.time(), 0)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            # Keep serving the current token and try again shortly
+            self._schedule(self.retry_interval)
+
+    def start(self) -> str:
+        self._stopped = False
+        return self.refresh()
+
+    def stop(self) -> None:
+        self._stopped = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+# asyncio counterpart of DeveloperJWTManager, refreshing from a background task
+class AsyncDeveloperJWTManager(DeveloperJWTManager):
+
+    def __init__(self, *args, **kwargs):
+        import asyncio
+
+        super().__init__(*args, **kwargs)
+        self._async_lock = asyncio.Lock()
+        self._task = None
+
+    async def _fetch(self) -> str:
+        response = await self._auth.get_dev_jwt(
+            client_id=self.client_id,
+            domain=self._domain,
+            private_key=self._private_key,
+            address=self._address,
+        )
+        return response["access_token"]
+
+    # Synchronous accessor used when building headers; the background task keeps it fresh
+    def get_token(self) -> str:
+        if self._token is None:
+            raise DimoError(
+                "No Developer JWT available yet. Await dimo.authenticate(...) first."
+            )
+        return self._token
+
+    async def refresh(self) -> str:
+        async with self._async_lock:
+            self._store(await self._fetch())
+            return self._token
+
+    async def _refresh_loop(self) -> None:
+        import asyncio
+
+        while not self._stopped:
+            if self._expires_at is None:
+                return
+            delay = max(self._expires_at - self.refresh_margin - time.time(), 0)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception:
+                await asyncio.sleep(self.retry_interval)
+
+    async def start(self) -> str:
+        import asyncio
+
+        self._stopped = False
+        token = await self.refresh()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._refresh_loop())
+        return token
+
+    def stop(self) -> None:
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,184 @@
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def slugify(value) -> str:
+    return "-".join(_WORD.findall(str(value or "").lower()))
+
+
+def _trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+# Normalizes a search result into the fields the index works with. The original
+# definition is kept under "definition" and returned by search.
+def _record(definition: dict) -> Optional[dict]:
+    definition_id = definition.get("id") or definition.get("legacy_ksuid")
+    if not definition_id:
+        return None
+    make = definition.get("make")
+    model = definition.get("model")
+    if isinstance(make, dict):
+        make = make.get("name")
+    return {
+        "id": definition_id,
+        "make_slug": definition.get("makeSlug") or slugify(make),
+        "model_slug": definition.get("modelSlug") or slugify(model),
+        "year": definition.get("year"),
+        "definition": definition,
+    }
+
+
+class _Snapshot:
+
+    def __init__(self, records: Dict[str, dict]):
+        self.records = records
+        postings = defaultdict(set)
+        for definition_id, record in records.items():
+            for word in self._words(record):
+                postings[word].add(definition_id)
+        self.postings = dict(postings)
+        self.vocabulary = sorted(postings)
+        grams = defaultdict(set)
+        for word in self.vocabulary:
+            for gram in _trigrams(word):
+                grams[gram].add(word)
+        self.grams = dict(grams)
+
+    @staticmethod
+    def _words(record: dict) -> set:
+        words = set(record["make_slug"].split("-")) | set(
+            record["model_slug"].split("-")
+        )
+        words.update((record["make_slug"], record["model_slug"]))
+        if record["year"] is not None:
+            words.add(str(record["year"]))
+        words.discard("")
+        return words
+
+    def prefix(self, token: str) -> set:
+        ids = set()
+        start = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            ids |= self.postings[word]
+        return ids
+
+    # Vocabulary words sharing enough trigrams with token, for misspelled input
+    def fuzzy(self, token: str, threshold: float) -> set:
+        grams = _trigrams(token)
+        shared = defaultdict(int)
+        for gram in grams:
+            for word in self.grams.get(gram, ()):
+                shared[word] += 1
+        ids = set()
+        for word, count in shared.items():
+            if count / len(grams | _trigrams(word)) >= threshold:
+                ids |= self.postings[word]
+        return ids
+
+
+# In-memory index of the device definition catalog, filled page by page with
+# DeviceDefinitions.sync_index. Serves prefix and trigram fuzzy search over make,
+# model and year without a network round trip. Updates build a new snapshot and swap
+# it in, so searches never wait on a sync.
+class DeviceDefinitionIndex:
+
+    def __init__(self, fuzzy_threshold: float = 0.4):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.synced_at = None
+        self._snapshot = _Snapshot({})
+        self._lock = threading.Lock()
+
+    # A cold index has never been synced, and search_device_definitions goes remote
+    @property
+    def is_warm(self) -> bool:
+        return self.synced_at is not None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.records)
+
+    # Adds or replaces definitions by id. replace=True first drops the indexed definitions
+    # in the synced slice (all of them, or those matching make_slug and year), so
+    # definitions removed upstream disappear as well.
+    def update(
+        self,
+        definitions: Iterable[dict],
+        replace: bool = False,
+        make_slug: str = None,
+        year: int = None,
+    ) -> int:
+        records = [record for record in map(_record, definitions) if record]
+        with self._lock:
+            merged = dict(self._snapshot.records)
+            if replace:
+                merged = {
+                    definition_id: record
+                    for definition_id, record in merged.items()
+                    if (make_slug is not None and record["make_slug"] != make_slug)
+                    or (year is not None and record["year"] != year)
+                }
+            merged.update((record["id"], record) for record in records)
+            self._snapshot = _Snapshot(merged)
+            self.synced_at = time.time()
+        return len(records)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = _Snapshot({})
+            self.synced_at = None
+
+    def _matches(self, snapshot: _Snapshot, token: str, fuzzy: bool) -> set:
+        ids = snapshot.prefix(token)
+        if not ids and fuzzy and len(token) > 2:
+            ids = snapshot.fuzzy(token, self.fuzzy_threshold)
+        return ids
+
+    # Every word of query has to prefix-match (or, with fuzzy, resemble) the make, model
+    # or year of a definition. make_slug, model_slug and year filter exactly.
+    def search(
+        self,
+        query: str = None,
+        make_slug: str = None,
+        model_slug: str = None,
+        year: int = None,
+        fuzzy: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        snapshot = self._snapshot
+        ids = None
+        for token in _WORD.findall((query or "").lower()):
+            matched = self._matches(snapshot, token, fuzzy)
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                return []
+        candidates = (
+            (snapshot.records[definition_id] for definition_id in ids)
+            if ids is not None
+            else snapshot.records.values()
+        )
+        results = [
+            record
+            for record in candidates
+            if (make_slug is None or record["make_slug"] == make_slug)
+            and (model_slug is None or record["model_slug"] == model_slug)
+            and (year is None or record["year"] == year)
+        ]
+        results.sort(
+            key=lambda record: (
+                record["make_slug"],
+                record["model_slug"],
+                -(record["year"] or 0),
+            )
+        )
+        if limit is not None:
+            results = results[:limit]
+        return [record["definition"] for record in results]
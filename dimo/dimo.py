@@ -8,58 +8,256 @@ from .api.valuations import Valuations
 from .graphql.identity import Identity
 from .graphql.telemetry import Telemetry
 
-from .request import Request
+from .codec import get_codec
+from .credentials import DeveloperJWTManager
+from .definition_index import DeviceDefinitionIndex
+from .instrumentation import graphql_operation_name
+from .pipeline import FleetPipeline
+from .request import Request, create_session
+from .routes import compile_template
+from .transport import Transport
+from .rate_limit import RateLimiter
+from .response_cache import ResponseCache
+from .retry import CircuitBreaker, RetryPolicy
+from .vin_cache import VINCache
 from .environments import dimo_environment
-import re
 
 
 class DIMO:
 
-    def __init__(self, env="Production"):
+    _auth_module = Auth
+    _device_definitions_module = DeviceDefinitions
+    _identity_module = Identity
+    _token_exchange_module = TokenExchange
+    _trips_module = Trips
+    _telemetry_module = Telemetry
+
+    def __init__(
+        self,
+        env="Production",
+        retry_policy: RetryPolicy = None,
+        circuit_breaker_threshold: int = 5,
+        circuit_breaker_timeout: float = 30.0,
+        rate_limits: dict = None,
+        hooks: list = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout=(10.0, 60.0),
+        http2: bool = False,
+        json_codec="auto",
+        cache: ResponseCache = None,
+        vin_cache: VINCache = None,
+        definition_index: DeviceDefinitionIndex = None,
+        transport: Transport = None,
+    ):
+        self._configure(
+            env,
+            retry_policy,
+            circuit_breaker_threshold,
+            circuit_breaker_timeout,
+            rate_limits,
+            hooks,
+            json_codec,
+            cache,
+        )
+        # Each client owns its connection pool. pool_maxsize is the number of pooled
+        # connections per host and should be at least the number of worker threads.
+        # A transport passed in replaces the default one and the pool options.
+        self.timeout = timeout
+        if transport is None:
+            transport = create_session(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                keep_alive=keep_alive,
+                timeout=timeout,
+                http2=http2,
+            )
+        self.transport = transport
+        self._create_modules(vin_cache, definition_index)
+
+    # Settings shared by DIMO and AsyncDIMO
+    def _configure(
+        self,
+        env,
+        retry_policy,
+        circuit_breaker_threshold,
+        circuit_breaker_timeout,
+        rate_limits,
+        hooks,
+        json_codec,
+        cache,
+    ):
         self.env = env
         self.urls = dimo_environment[env]
         self._client_id = None
+        self.credentials = None
+        self._configure_resilience(
+            retry_policy, circuit_breaker_threshold, circuit_breaker_timeout
+        )
+        self.rate_limiter = RateLimiter(rate_limits) if rate_limits else None
+        self.hooks = list(hooks or [])
+        self.json_codec = get_codec(json_codec)
+        self.cache = cache
+
+    # Builds the API modules from the _*_module classes, which AsyncDIMO swaps for their
+    # asyncio counterparts
+    def _create_modules(self, vin_cache, definition_index):
         self.attestation = Attestation(self.request, self._get_auth_headers)
-        self.auth = Auth(self.request, self._get_auth_headers, self.env, self)
-        self.device_definitions = DeviceDefinitions(
-            self.request, self._get_auth_headers
+        self.auth = self._auth_module(
+            self.request, self._get_auth_headers, self.env, self
         )
-        self.identity = Identity(self)
-        self.token_exchange = TokenExchange(
+        self.device_definitions = self._device_definitions_module(
+            self.request, self._get_auth_headers, vin_cache, definition_index
+        )
+        self.identity = self._identity_module(self)
+        self.token_exchange = self._token_exchange_module(
             self.request, self._get_auth_headers, self.identity, self
         )
-        self.trips = Trips(self.request, self._get_auth_headers)
+        self.trips = self._trips_module(self.request, self._get_auth_headers)
         self.valuations = Valuations(self.request, self._get_auth_headers)
-        self.telemetry = Telemetry(self)
-        self._session = Request.session
+        self.telemetry = self._telemetry_module(self)
 
-    # Creates a full path for endpoints combining DIMO service, specific endpoint, and optional params
-    def _get_full_path(self, service, path, params=None):
-        base_path = self.urls[service]
-        full_path = f"{base_path}{path}"
+    # Retries idempotent calls per retry_policy and keeps one circuit breaker per DIMO
+    # service. A threshold of 0 or None turns the circuit breakers off.
+    def _configure_resilience(
+        self, retry_policy, circuit_breaker_threshold, circuit_breaker_timeout
+    ):
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breakers = {}
+        if circuit_breaker_threshold:
+            self.circuit_breakers = {
+                service: CircuitBreaker(
+                    service, circuit_breaker_threshold, circuit_breaker_timeout
+                )
+                for service in self.urls
+            }
+
+    # Registers a callable that receives a RequestEvent after every call
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _request_options(self, service, idempotent, endpoint=None, cacheable=None):
+        return {
+            "hooks": self.hooks,
+            "service": service,
+            "endpoint": endpoint,
+            "retry_policy": self.retry_policy,
+            "circuit_breaker": self.circuit_breakers.get(service),
+            "idempotent": idempotent,
+            "codec": self.json_codec,
+            "cache": self.cache,
+            "cacheable": cacheable,
+            "rate_limit": (
+                self.rate_limiter.bucket(service)
+                if self.rate_limiter is not None
+                else None
+            ),
+        }
+
+    # GraphQL reads are sent as POST but are safe to retry, mutations are not
+    def _is_idempotent_query(self, query):
+        return not query.lstrip().startswith("mutation")
 
+    # Creates a full path for endpoints combining DIMO service, specific endpoint, and optional params.
+    # Paths with params are compiled once, see dimo.routes.
+    def _get_full_path(self, service, path, params=None):
         if params:
-            for key, value in params.items():
-                pattern = f":{key}"
-                full_path = re.sub(pattern, str(value), full_path)
-        return full_path
+            path = compile_template(path).path(**params)
+        return self.urls[service] + path
+
+    # Keeps a Developer JWT for this client and refreshes it in the background before it expires
+    def authenticate(
+        self,
+        client_id: str,
+        domain: str,
+        private_key: str,
+        address: str = None,
+        refresh_margin: float = 300.0,
+    ) -> DeveloperJWTManager:
+        if self.credentials is not None:
+            self.credentials.stop()
+        self.credentials = DeveloperJWTManager(
+            self.auth,
+            client_id,
+            domain,
+            private_key,
+            address=address,
+            refresh_margin=refresh_margin,
+        )
+        self.credentials.start()
+        return self.credentials
 
-    # Sets headers based on access_token or privileged_token
-    def _get_auth_headers(self, token):
+    def _get_developer_jwt(self) -> str:
+        if self.credentials is None:
+            raise ValueError(
+                "No developer_jwt provided. Pass one explicitly or call dimo.authenticate() first."
+            )
+        return self.credentials.get_token()
+
+    # Sets headers based on access_token or privileged_token, defaulting to the managed Developer JWT
+    def _get_auth_headers(self, token=None):
+        if token is None:
+            token = self._get_developer_jwt()
         return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-    # request method for HTTP requests for the REST API
-    def request(self, http_method, service, path, **kwargs):
+    # request method for HTTP requests for the REST API, raw=True returns the body bytes
+    def request(
+        self,
+        http_method,
+        service,
+        path,
+        idempotent=None,
+        endpoint=None,
+        raw=False,
+        cacheable=None,
+        **kwargs,
+    ):
         full_path = self._get_full_path(service, path)
-        return Request(http_method, full_path)(**kwargs)
+        options = self._request_options(service, idempotent, endpoint, cacheable)
+        return Request(
+            http_method,
+            full_path,
+            session=self.transport,
+            timeout=self.timeout,
+            raw=raw,
+            **options,
+        )(**kwargs)
+
+    # Pipeline of per-vehicle stages run across a fleet, see dimo.pipeline
+    def fleet_pipeline(self, service_limits: dict = None) -> FleetPipeline:
+        return FleetPipeline(self, service_limits)
+
+    # Closes the pooled connections held by this client
+    def close(self):
+        if self.credentials is not None:
+            self.credentials.stop()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     # query method for graphQL queries, identity and telemetry
-    def query(self, service, query, variables=None, token=None):
+    def query(self, service, query, variables=None, token=None, raw=False):
         headers = self._get_auth_headers(token) if token else {}
         headers["Content-Type"] = "application/json"
         headers["User-Agent"] = "dimo-python-sdk"
 
         data = {"query": query, "variables": variables or {}}
 
-        response = self.request("POST", service, "", headers=headers, data=data)
+        response = self.request(
+            "POST",
+            service,
+            "",
+            idempotent=self._is_idempotent_query(query),
+            endpoint=graphql_operation_name(query),
+            raw=raw,
+            headers=headers,
+            data=data,
+        )
         return response
@@ -1,14 +1,122 @@
-from eth_account import Account
-from eth_account.messages import encode_defunct
-from eth_utils import to_bytes, remove_0x_prefix, add_0x_prefix
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+
+# eth_account pulls in the whole crypto stack, so it is only imported on first sign
+# to keep `import dimo` fast for callers that never sign anything
+def _eth_account():
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+
+    return Account, encode_defunct
+
+
+def _add_0x_prefix(value: str) -> str:
+    return value if value.startswith(("0x", "0X")) else f"0x{value}"
+
+
+def _normalize_key(private_key: str) -> str:
+    if private_key.startswith(("0x", "0X")):
+        private_key = private_key[2:]
+    return f"0x{private_key}"
+
+
+def _sign(account, message: str) -> str:
+    _, encode_defunct = _eth_account()
+    signed_message = account.sign_message(encode_defunct(text=message))
+    return _add_0x_prefix(signed_message.signature.hex())
+
+
+# Runs in a worker process: derives the account once for all messages signed with it
+def _sign_group(private_key: str, messages: List[str]) -> List[str]:
+    Account, _ = _eth_account()
+    account = Account.from_key(_normalize_key(private_key))
+    return [_sign(account, message) for message in messages]
+
+
+# Signs messages with accounts derived once per private key. Derived accounts are kept
+# in a bounded LRU keyed by a SHA-256 digest of the key, so the cache never holds
+# private keys as lookup keys and old accounts drop out once max_accounts is reached.
+class CachedSigner:
+
+    def __init__(self, max_accounts: int = 64):
+        self.max_accounts = max_accounts
+        self._accounts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def account(self, private_key: str):
+        private_key = _normalize_key(private_key)
+        digest = hashlib.sha256(private_key.lower().encode()).digest()
+        with self._lock:
+            account = self._accounts.get(digest)
+            if account is not None:
+                self._accounts.move_to_end(digest)
+                return account
+        Account, _ = _eth_account()
+        account = Account.from_key(private_key)
+        with self._lock:
+            self._accounts[digest] = account
+            self._accounts.move_to_end(digest)
+            while len(self._accounts) > self.max_accounts:
+                self._accounts.popitem(last=False)
+        return account
+
+    def sign_message(self, message: str, private_key: str) -> str:
+        return _sign(self.account(private_key), message)
+
+    # Signs (message, private_key) pairs and returns the signatures in input order.
+    # With processes set, the batch is signed in a process pool of that size, which
+    # pays off for large batches since signing is CPU bound.
+    def sign_messages(
+        self, items: Iterable[Tuple[str, str]], processes: Optional[int] = None
+    ) -> List[str]:
+        items = list(items)
+        if not processes:
+            return [self.sign_message(message, key) for message, key in items]
+
+        # Chunks of one key each, small enough to spread a single key over every worker
+        chunk_size = max(1, -(-len(items) // (processes * 4)))
+        groups = OrderedDict()
+        for index, (message, private_key) in enumerate(items):
+            groups.setdefault(_normalize_key(private_key), []).append((index, message))
+        tasks = [
+            (private_key, group[start : start + chunk_size])
+            for private_key, group in groups.items()
+            for start in range(0, len(group), chunk_size)
+        ]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        signatures = [None] * len(items)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = executor.map(
+                _sign_group,
+                [private_key for private_key, _ in tasks],
+                [[message for _, message in chunk] for _, chunk in tasks],
+            )
+            for (_, chunk), chunk_signatures in zip(tasks, results):
+                for (index, _), signature in zip(chunk, chunk_signatures):
+                    signatures[index] = signature
+        return signatures
+
+    # Drops every derived account, e.g. after rotating keys
+    def clear(self) -> None:
+        with self._lock:
+            self._accounts.clear()
+
+
+default_signer = CachedSigner()
 
 
 class EthSigner:
     @staticmethod
     def sign_message(message: str, private_key: str) -> str:
-        private_key = add_0x_prefix(remove_0x_prefix(private_key))
-        message_hash = encode_defunct(text=message)
-        account = Account.from_key(private_key)
-        signed_message = account.sign_message(message_hash)
+        return default_signer.sign_message(message, private_key)
 
-        return add_0x_prefix(signed_message.signature.hex())
\ No newline at end of file
+    @staticmethod
+    def sign_messages(
+        items: Iterable[Tuple[str, str]], processes: Optional[int] = None
+    ) -> List[str]:
+        return default_signer.sign_messages(items, processes)
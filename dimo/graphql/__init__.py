@@ -1,4 +1,23 @@
-from .identity import Identity
-from .telemetry import Telemetry
+import importlib
 
-__all__ = ["Identity", "Telemetry"]
+_LAZY_ATTRIBUTES = {
+    "Identity": ".identity",
+    "AsyncIdentity": ".identity",
+    "Telemetry": ".telemetry",
+    "AsyncTelemetry": ".telemetry",
+}
+
+__all__ = ["Identity", "AsyncIdentity", "Telemetry", "AsyncTelemetry"]
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
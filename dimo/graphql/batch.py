@@ -0,0 +1,48 @@
+from typing import Dict, Tuple
+
+from dimo.errors import DimoError
+
+
+# token_id -> value of an aliased batch query, plus the errors the API reported for
+# single vehicles
+class VehicleBatch(dict):
+
+    def __init__(self):
+        super().__init__()
+        self.errors: Dict[int, BaseException] = {}
+
+
+def _message(error) -> str:
+    if isinstance(error, dict):
+        return str(error.get("message", error))
+    return str(error)
+
+
+# Splits the response of a query aliasing one field per vehicle as v0, v1, ... into its
+# data and per-vehicle errors. Errors whose path starts at an alias fail that vehicle
+# only, errors that cannot be tied to one alias fail every vehicle in the batch. A
+# response without data fails the whole batch with a DimoError.
+def split_batch_response(
+    response: dict, token_ids: list, service: str
+) -> Tuple[dict, Dict[int, DimoError]]:
+    response = response or {}
+    data = response.get("data")
+    errors = response.get("errors") or []
+    if data is None and errors:
+        messages = "; ".join(_message(error) for error in errors)
+        raise DimoError(f"{service} batch query failed: {messages}")
+
+    aliases = {f"v{i}": token_id for i, token_id in enumerate(token_ids)}
+    messages = {}
+    for error in errors:
+        path = error.get("path") if isinstance(error, dict) else None
+        token_id = aliases.get(path[0]) if path else None
+        for target in token_ids if token_id is None else (token_id,):
+            messages.setdefault(target, []).append(_message(error))
+    failures = {
+        token_id: DimoError(
+            f"{service} query failed for vehicle {token_id}: {'; '.join(found)}"
+        )
+        for token_id, found in messages.items()
+    }
+    return data or {}, failures
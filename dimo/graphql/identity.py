@@ -1,3 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+from dimo.errors import check_type
+from dimo.graphql.batch import VehicleBatch, split_batch_response
+
+
 class Identity:
     def __init__(self, dimo_instance):
         self.dimo = dimo_instance
@@ -222,3 +227,297 @@ class Identity:
         variables = {"tokenId": token_id}
 
         return self.dimo.query("Identity", query, variables=variables)
+
+    # Follows pageInfo { endCursor hasNextPage } of the connection at data[connection]
+    # and yields its nodes one at a time. The next page is fetched in the background
+    # while the current one is consumed, so at most two pages are held in memory.
+    # The query must declare $first: Int! and $after: String.
+    def paginate(
+        self,
+        query: str,
+        connection: str,
+        variables: dict = None,
+        page_size: int = 100,
+        prefetch: bool = True,
+    ):
+        check_type("connection", connection, str)
+        check_type("page_size", page_size, int)
+        variables = dict(variables or {}, first=page_size, after=None)
+
+        def fetch(after):
+            return self.dimo.query(
+                "Identity", query, variables=dict(variables, after=after)
+            )
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            response = fetch(None)
+            while True:
+                nodes, page_info = self._read_page(response, connection)
+                has_next = page_info.get("hasNextPage") and page_info.get("endCursor")
+                upcoming = None
+                if has_next and prefetch:
+                    upcoming = executor.submit(fetch, page_info["endCursor"])
+                yield from nodes
+                if not has_next:
+                    return
+                response = (
+                    upcoming.result() if upcoming else fetch(page_info["endCursor"])
+                )
+
+    def _read_page(self, response: dict, connection: str):
+        page = ((response or {}).get("data") or {}).get(connection) or {}
+        return page.get("nodes") or [], page.get("pageInfo") or {}
+
+    # Builds a paginated vehicles-by-owner query selecting the given node fields
+    def _owner_vehicles_page_query(
+        self, name: str, selection: str, declarations: str = "", filters: str = ""
+    ) -> str:
+        return """
+      query %s($owner: Address!, $first: Int!, $after: String%s) {
+        vehicles(filterBy: {owner: $owner%s}, first: $first, after: $after) {
+          nodes {%s}
+          pageInfo {
+            endCursor
+            hasNextPage
+          }
+        }
+      }
+      """ % (name, declarations, filters, selection)
+
+    # Iterates over every vehicle definition owned by address
+    def iter_vehicle_definitions_per_address(self, address: str, page_size: int = 100):
+        query = self._owner_vehicles_page_query(
+            "ListVehicleDefinitionsPerAddressPage",
+            """
+            aftermarketDevice {
+              tokenId
+              address
+            }
+            syntheticDevice {
+              address
+              tokenId
+            }
+            definition {
+              make
+              model
+              year
+            }
+          """,
+        )
+        return self.paginate(query, "vehicles", {"owner": address}, page_size)
+
+    # Iterates over the MMY of every vehicle owned by address
+    def iter_mmy_by_owner(self, address: str, page_size: int = 100):
+        query = self._owner_vehicles_page_query(
+            "MMYByOwnerPage",
+            """
+            definition {
+              make
+              model
+              year
+            }
+          """,
+        )
+        return self.paginate(query, "vehicles", {"owner": address}, page_size)
+
+    # Iterates over the tokenIds and privileges of every vehicle owned by address
+    def iter_token_ids_privileges_by_owner(
+        self, address: str, privileges_limit: int, page_size: int = 100
+    ):
+        query = self._owner_vehicles_page_query(
+            "TokenIDsPrivilegesByOwnerPage",
+            """
+            tokenId
+            privileges(first: $firstPrivileges) {
+              nodes {
+                setAt
+                expiresAt
+                id
+              }
+            }
+          """,
+            declarations=", $firstPrivileges: Int!",
+        )
+        variables = {"owner": address, "firstPrivileges": privileges_limit}
+        return self.paginate(query, "vehicles", variables, page_size)
+
+    # Iterates over every vehicle owned by owner_address that was granted to dev_address
+    def iter_token_ids_granted_to_dev_by_owner(
+        self, dev_address: str, owner_address: str, page_size: int = 100
+    ):
+        query = self._owner_vehicles_page_query(
+            "ListTokenIdsGrantedToDevByOwnerPage",
+            """
+            tokenId
+            definition {
+              make
+            }
+            aftermarketDevice {
+              manufacturer {
+                name
+              }
+            }
+          """,
+            declarations=", $privileged: Address!",
+            filters=", privileged: $privileged",
+        )
+        variables = {"owner": owner_address, "privileged": dev_address}
+        return self.paginate(query, "vehicles", variables, page_size)
+
+    # Iterates over the DCNs of every vehicle owned by address
+    def iter_dcn_by_owner(self, address: str, page_size: int = 100):
+        query = self._owner_vehicles_page_query(
+            "DCNByOwnerPage",
+            """
+            dcn {
+              node
+              name
+              vehicle {
+                tokenId
+              }
+            }
+          """,
+        )
+        return self.paginate(query, "vehicles", {"owner": address}, page_size)
+
+    # Iterates over the earnings of every vehicle owned by address, with up to
+    # history_limit history entries per vehicle
+    def iter_rewards_history_by_owner(
+        self, address: str, history_limit: int, page_size: int = 100
+    ):
+        query = self._owner_vehicles_page_query(
+            "GetVehicleDataByOwnerPage",
+            """
+            earnings {
+              history (first: $firstHistory) {
+                edges {
+                  node {
+                    week
+                    aftermarketDeviceTokens
+                    syntheticDeviceTokens
+                    sentAt
+                    beneficiary
+                    connectionStreak
+                    streakTokens
+                  }
+                }
+              }
+              totalTokens
+            }
+          """,
+            declarations=", $firstHistory: Int!",
+        )
+        variables = {"owner": address, "firstHistory": history_limit}
+        return self.paginate(query, "vehicles", variables, page_size)
+
+    # Builds one query that looks up the SACDs of many vehicles through aliased vehicle fields
+    def _privileges_batch_query(self, token_ids: list):
+        declarations = ", ".join(f"$t{i}: Int!" for i in range(len(token_ids)))
+        fields = "\n".join(f"""
+        v{i}: vehicle(tokenId: $t{i}) {{
+          sacds(first:100) {{
+            nodes {{
+              permissions
+              grantee
+            }}
+          }}
+        }}""" for i in range(len(token_ids)))
+        query = f"""
+      query CheckPrivilegesBatch({declarations}) {{{fields}
+      }}
+      """
+        variables = {f"t{i}": token_id for i, token_id in enumerate(token_ids)}
+        return query, variables
+
+    # Maps each token_id to its aliased vehicle object. Unknown vehicles map to None and
+    # vehicles the API reported an error for go to vehicles.errors instead.
+    def _collect_privileges_batch(
+        self, vehicles: VehicleBatch, response: dict, token_ids: list
+    ) -> None:
+        data, errors = split_batch_response(response, token_ids, "Identity")
+        vehicles.errors.update(errors)
+        for i, token_id in enumerate(token_ids):
+            if token_id not in errors:
+                vehicles[token_id] = data.get(f"v{i}")
+
+    def _privilege_chunks(self, token_ids, chunk_size: int):
+        check_type("chunk_size", chunk_size, int)
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        token_ids = list(dict.fromkeys(token_ids))
+        for token_id in token_ids:
+            check_type("token_id", token_id, int)
+        return [
+            token_ids[i : i + chunk_size] for i in range(0, len(token_ids), chunk_size)
+        ]
+
+    # Batched check_vehicle_privileges - looks up chunk_size vehicles per GraphQL request
+    # and returns {token_id: {"sacds": {"nodes": [...]}} or None}, with per-vehicle API
+    # errors in .errors. Raises DimoError when a whole batch fails.
+    def check_vehicles_privileges(
+        self, token_ids: list, chunk_size: int = 50
+    ) -> VehicleBatch:
+        vehicles = VehicleBatch()
+        for chunk in self._privilege_chunks(token_ids, chunk_size):
+            query, variables = self._privileges_batch_query(chunk)
+            response = self.dimo.query("Identity", query, variables=variables)
+            self._collect_privileges_batch(vehicles, response, chunk)
+        return vehicles
+
+
+class AsyncIdentity(Identity):
+
+    async def check_vehicles_privileges(
+        self, token_ids: list, chunk_size: int = 50
+    ) -> VehicleBatch:
+        import asyncio
+
+        chunks = self._privilege_chunks(token_ids, chunk_size)
+        responses = await asyncio.gather(
+            *[
+                self.dimo.query("Identity", query, variables=variables)
+                for query, variables in map(self._privileges_batch_query, chunks)
+            ]
+        )
+        vehicles = VehicleBatch()
+        for chunk, response in zip(chunks, responses):
+            self._collect_privileges_batch(vehicles, response, chunk)
+        return vehicles
+
+    # Async generator counterpart of Identity.paginate, prefetching with a background task
+    async def paginate(
+        self,
+        query: str,
+        connection: str,
+        variables: dict = None,
+        page_size: int = 100,
+        prefetch: bool = True,
+    ):
+        import asyncio
+
+        check_type("connection", connection, str)
+        check_type("page_size", page_size, int)
+        variables = dict(variables or {}, first=page_size, after=None)
+
+        def fetch(after):
+            return self.dimo.query(
+                "Identity", query, variables=dict(variables, after=after)
+            )
+
+        response = await fetch(None)
+        upcoming = None
+        try:
+            while True:
+                nodes, page_info = self._read_page(response, connection)
+                has_next = page_info.get("hasNextPage") and page_info.get("endCursor")
+                if has_next and prefetch:
+                    upcoming = asyncio.ensure_future(fetch(page_info["endCursor"]))
+                for node in nodes:
+                    yield node
+                if not has_next:
+                    return
+                response = await (upcoming or fetch(page_info["endCursor"]))
+                upcoming = None
+        finally:
+            if upcoming is not None:
+                upcoming.cancel()
@@ -1,28 +1,13 @@
-class Telemetry:
-    def __init__(self, dimo_instance):
-        self.dimo = dimo_instance
+from dimo.columnar import check_output, to_columns
+from dimo.concurrency import amap_ordered, arun_bounded, map_ordered, run_bounded
+from dimo.errors import DimoError, DimoValueError, check_type
+from dimo.graphql.batch import VehicleBatch, split_batch_response
+from dimo.time_windows import format_time, parse_time, plan_windows
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import re
+import time
 
-    # Primary query method
-    def query(self, query, vehicle_jwt):
-        return self.dimo.query("Telemetry", query, token=vehicle_jwt)
-    
-    def available_signals(self, vehicle_jwt: str, token_id: int) -> dict:
-        query = """
-        query getAvailableSignals($tokenId: Int!) {
-            availableSignals (tokenId: $tokenId)
-        }
-        """
-        variables = {"tokenId": token_id}
-        
-        return self.dimo.query(
-            "Telemetry", query, token=vehicle_jwt, variables=variables
-        )
-
-    # Sample query - get signals latest
-    def get_signals_latest(self, vehicle_jwt: str, token_id: int) -> dict:
-        query = """
-        query GetSignalsLatest($tokenId: Int!) {
-            signalsLatest(tokenId: $tokenId){
+SIGNALS_LATEST_FIELDS = """
                 powertrainTransmissionTravelledDistance{
                     timestamp
                     value
@@ -39,7 +24,76 @@ class Telemetry:
                     timestamp
                     value
                 }
-            }
+            """
+
+DAILY_SIGNALS_AUTOPI_FIELDS = """
+                speed(agg: MED)
+                powertrainType(agg: RAND)
+                powertrainRange(agg: MIN)
+                exteriorAirTemperature(agg: MAX)
+                chassisAxleRow1WheelLeftTirePressure(agg: MIN)
+                timestamp
+            """
+
+DAILY_AVERAGE_SPEED_FIELDS = """
+                timestamp
+                avgSpeed: speed(agg: AVG)
+            """
+
+DAILY_MAX_SPEED_FIELDS = """
+                timestamp
+                maxSpeed: speed(agg: MAX)
+            """
+
+_WINDOW_TIMESTAMP_ERROR = "Windowed signals queries must select timestamp in fields"
+
+
+class BatchTiming(NamedTuple):
+    token_ids: Tuple[int, ...]
+    elapsed: float
+    error: Optional[BaseException]
+
+
+# Result of get_signals_latest_many: a dict of token_id -> signalsLatest, plus the
+# per-vehicle errors and the timing of every batched request
+class SignalsLatestBatch(VehicleBatch):
+
+    def __init__(self):
+        super().__init__()
+        self.timings: List[BatchTiming] = []
+
+
+class Telemetry:
+    def __init__(self, dimo_instance):
+        self.dimo = dimo_instance
+
+    # Primary query method
+    # output="columns" returns data[field] as column arrays, see dimo.columnar.to_columns
+    # output="raw" returns the undecoded response bytes
+    def query(self, query, vehicle_jwt, output="json", columns=None, field="signals"):
+        if output == "raw":
+            return self.dimo.query("Telemetry", query, token=vehicle_jwt, raw=True)
+        check_output(output)
+        response = self.dimo.query("Telemetry", query, token=vehicle_jwt)
+        return self._format_signals(response, output, columns, field)
+
+    def _format_signals(self, response, output, columns=None, field="signals"):
+        if output == "json":
+            return response
+        response = response or {}
+        data = response.get("data") or {}
+        if data.get(field) is None and response.get("errors"):
+            raise DimoError(f"Telemetry query failed: {response['errors']}")
+        if field not in data:
+            raise DimoValueError(
+                f"Telemetry response has no {field!r} field, it has: {', '.join(data) or 'none'}"
+            )
+        return to_columns(data[field] or [], columns)
+
+    def available_signals(self, vehicle_jwt: str, token_id: int) -> dict:
+        query = """
+        query getAvailableSignals($tokenId: Int!) {
+            availableSignals (tokenId: $tokenId)
         }
         """
         variables = {"tokenId": token_id}
@@ -48,82 +102,293 @@ class Telemetry:
             "Telemetry", query, token=vehicle_jwt, variables=variables
         )
 
-    # Sample query - daily signals from autopi
-    def get_daily_signals_autopi(
-        self, vehicle_jwt: str, token_id: int, start_date: str, end_date: str
-    ) -> dict:
+    # Sample query - get signals latest
+    def get_signals_latest(self, vehicle_jwt: str, token_id: int) -> dict:
         query = """
-        query GetDailySignalsAutopi($tokenId: Int!, $startDate: Time!, $endDate: Time!) {
-            signals(
-                tokenId: $tokenId,
-                interval: "24h",
-                from: $startDate, 
-                to: $endDate,
-                filter: {
-                    source: "autopi"
-                })
-                {
-                    speed(agg: MED)
-                    powertrainType(agg: RAND)
-                    powertrainRange(agg: MIN) 
-                    exteriorAirTemperature(agg: MAX)
-                    chassisAxleRow1WheelLeftTirePressure(agg: MIN)
-                    timestamp
-                }
-            }
-            """
-        variables = {"tokenId": token_id, "startDate": start_date, "endDate": end_date}
+        query GetSignalsLatest($tokenId: Int!) {
+            signalsLatest(tokenId: $tokenId){%s}
+        }
+        """ % SIGNALS_LATEST_FIELDS
+        variables = {"tokenId": token_id}
 
         return self.dimo.query(
             "Telemetry", query, token=vehicle_jwt, variables=variables
         )
 
-    # Sample query - daily average speed of a specific vehicle
-    def get_daily_average_speed(
-        self, vehicle_jwt: str, token_id: int, start_date: str, end_date: str
-    ) -> dict:
-        query = """
-        query GetDailyAverageSpeed($tokenId: Int!, $startDate: Time!, $endDate: Time!) {
-         signals (
-            tokenId: $tokenId,
-            from: $startDate,
-            to: $endDate,
-            interval: "24h"
-            )
-        {
-            timestamp
-            avgSpeed: speed(agg: AVG)
-        }
-        }
-        """
-        variables = {"tokenId": token_id, "startDate": start_date, "endDate": end_date}
+    # Groups (vehicle_jwt, token_id) pairs into batches that can share one query.
+    # A Telemetry query is scoped to a single JWT, so only pairs with the same JWT are merged.
+    def _signals_latest_batches(self, vehicles, batch_size: int):
+        check_type("batch_size", batch_size, int)
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        groups = {}
+        for vehicle_jwt, token_id in vehicles:
+            check_type("vehicle_jwt", vehicle_jwt, str)
+            check_type("token_id", token_id, int)
+            groups.setdefault(vehicle_jwt, []).append(token_id)
+        for vehicle_jwt, token_ids in groups.items():
+            token_ids = list(dict.fromkeys(token_ids))
+            for i in range(0, len(token_ids), batch_size):
+                yield vehicle_jwt, token_ids[i : i + batch_size]
 
-        return self.dimo.query(
-            "Telemetry", query, token=vehicle_jwt, variables=variables
+    def _signals_latest_batch_query(self, token_ids: list):
+        declarations = ", ".join(f"$t{i}: Int!" for i in range(len(token_ids)))
+        fields = "".join(
+            f"""
+            v{i}: signalsLatest(tokenId: $t{i}){{{SIGNALS_LATEST_FIELDS}}}"""
+            for i in range(len(token_ids))
         )
+        query = f"""
+        query GetSignalsLatestBatch({declarations}) {{{fields}
+        }}
+        """
+        variables = {f"t{i}": token_id for i, token_id in enumerate(token_ids)}
+        return query, variables
 
-    # Sample query - daily max speed of a specific vehicle
-    def get_daily_max_speed(
-        self, vehicle_jwt: str, token_id: int, start_date: str, end_date: str
-    ) -> dict:
-        query = """
-        query GetMaxSpeed($tokenId: Int!, $startDate: Time!, $endDate: Time!) {
+    # Vehicles of a failed request, or the API reported errors for, go to results.errors
+    def _collect_signals_latest(self, results: SignalsLatestBatch, outcome) -> None:
+        (_, token_ids), (response, elapsed, error), _ = outcome
+        errors = {}
+        if error is None:
+            try:
+                data, errors = split_batch_response(response, token_ids, "Telemetry")
+            except DimoError as e:
+                error = e
+        results.timings.append(BatchTiming(tuple(token_ids), elapsed, error))
+        if error is not None:
+            for token_id in token_ids:
+                results.errors[token_id] = error
+            return
+        results.errors.update(errors)
+        for i, token_id in enumerate(token_ids):
+            if token_id not in errors:
+                results[token_id] = data.get(f"v{i}")
+
+    # Fetches signalsLatest for many vehicles. Pairs sharing a JWT are merged into
+    # aliased queries of up to batch_size vehicles, and batches run concurrently.
+    def get_signals_latest_many(
+        self, vehicles: list, batch_size: int = 25, max_workers: int = 8
+    ) -> SignalsLatestBatch:
+        check_type("max_workers", max_workers, int)
+
+        def run_batch(batch):
+            vehicle_jwt, token_ids = batch
+            query, variables = self._signals_latest_batch_query(token_ids)
+            started = time.perf_counter()
+            try:
+                response = self.dimo.query(
+                    "Telemetry", query, token=vehicle_jwt, variables=variables
+                )
+            except Exception as e:
+                return None, time.perf_counter() - started, e
+            return response, time.perf_counter() - started, None
+
+        results = SignalsLatestBatch()
+        batches = self._signals_latest_batches(vehicles, batch_size)
+        for outcome in run_bounded(run_batch, batches, max_workers):
+            self._collect_signals_latest(results, outcome)
+        return results
+
+    # Builds a signals(from, to) query over $startDate/$endDate selecting fields
+    def _signals_query(
+        self, name: str, fields: str, interval: str = "24h", filter: str = None
+    ) -> str:
+        filter_arg = """,
+                filter: {
+                    %s
+                }""" % filter if filter else ""
+        return """
+        query %s($tokenId: Int!, $startDate: Time!, $endDate: Time!) {
             signals(
                 tokenId: $tokenId,
+                interval: "%s",
                 from: $startDate,
-                to: $endDate,
-                interval: "24h"
+                to: $endDate%s
             )
-        {
-            timestamp
-            maxSpeed: speed(agg: MAX)
+            {%s}
         }
+        """ % (name, interval, filter_arg, fields)
+
+    # Windowed ranges sort and split rows by their timestamp, so it must be selected
+    def _check_window_fields(self, fields: str) -> None:
+        check_type("fields", fields, str)
+        if not re.search(r"\btimestamp\b", fields):
+            raise DimoValueError(_WINDOW_TIMESTAMP_ERROR)
+
+    # Keeps the rows of one window that fall inside [window_from, window_to), in time order
+    def _window_rows(self, response: dict, window) -> list:
+        response = response or {}
+        data = response.get("data") or {}
+        if data.get("signals") is None and response.get("errors"):
+            raise DimoError(f"Telemetry signals query failed: {response['errors']}")
+        window_from, window_to = window
+        rows = []
+        for row in data.get("signals") or []:
+            if "timestamp" not in row:
+                raise DimoValueError(_WINDOW_TIMESTAMP_ERROR)
+            timestamp = parse_time(row["timestamp"])
+            if window_from <= timestamp < window_to:
+                rows.append((timestamp, row))
+        rows.sort(key=lambda pair: pair[0])
+        return [row for _, row in rows]
+
+    def _window_variables(self, token_id: int, window) -> dict:
+        return {
+            "tokenId": token_id,
+            "startDate": format_time(window[0]),
+            "endDate": format_time(window[1]),
         }
-        """
-        variables = {"tokenId": token_id, "startDate": start_date, "endDate": end_date}
 
-        return self.dimo.query(
-            "Telemetry", query, token=vehicle_jwt, variables=variables
+    # Streams signals rows over [start_date, end_date) in time order. The range is split
+    # into windows of about `window` that run up to max_workers at a time, so latency
+    # and memory depend on the window size rather than the length of the range.
+    def iter_signals(
+        self,
+        vehicle_jwt: str,
+        token_id: int,
+        fields: str,
+        start_date,
+        end_date,
+        interval: str = "24h",
+        window="720h",
+        filter: str = None,
+        max_workers: int = 4,
+    ) -> Iterator[dict]:
+        check_type("vehicle_jwt", vehicle_jwt, str)
+        check_type("token_id", token_id, int)
+        self._check_window_fields(fields)
+        windows = plan_windows(start_date, end_date, interval, window)
+        query = self._signals_query("GetSignalsWindow", fields, interval, filter)
+
+        def fetch(window):
+            response = self.dimo.query(
+                "Telemetry",
+                query,
+                token=vehicle_jwt,
+                variables=self._window_variables(token_id, window),
+            )
+            return self._window_rows(response, window)
+
+        for rows in map_ordered(fetch, windows, max_workers):
+            yield from rows
+
+    # Runs a signals query in one request, or split into windows when window is set
+    def _signals_range(
+        self,
+        name,
+        fields,
+        vehicle_jwt,
+        token_id,
+        start_date,
+        end_date,
+        filter=None,
+        window=None,
+        max_workers=4,
+        output="json",
+        columns=None,
+    ):
+        check_output(output)
+        if window is None:
+            variables = {
+                "tokenId": token_id,
+                "startDate": start_date,
+                "endDate": end_date,
+            }
+            response = self.dimo.query(
+                "Telemetry",
+                self._signals_query(name, fields, filter=filter),
+                token=vehicle_jwt,
+                variables=variables,
+            )
+            return self._format_signals(response, output, columns)
+        rows = self.iter_signals(
+            vehicle_jwt,
+            token_id,
+            fields,
+            start_date,
+            end_date,
+            window=window,
+            filter=filter,
+            max_workers=max_workers,
+        )
+        if output == "columns":
+            return to_columns(rows, columns)
+        return {"data": {"signals": list(rows)}}
+
+    # Sample query - daily signals from autopi
+    def get_daily_signals_autopi(
+        self,
+        vehicle_jwt: str,
+        token_id: int,
+        start_date: str,
+        end_date: str,
+        window=None,
+        max_workers: int = 4,
+        output: str = "json",
+        columns: list = None,
+    ):
+        return self._signals_range(
+            "GetDailySignalsAutopi",
+            DAILY_SIGNALS_AUTOPI_FIELDS,
+            vehicle_jwt,
+            token_id,
+            start_date,
+            end_date,
+            filter='source: "autopi"',
+            window=window,
+            max_workers=max_workers,
+            output=output,
+            columns=columns,
+        )
+
+    # Sample query - daily average speed of a specific vehicle
+    def get_daily_average_speed(
+        self,
+        vehicle_jwt: str,
+        token_id: int,
+        start_date: str,
+        end_date: str,
+        window=None,
+        max_workers: int = 4,
+        output: str = "json",
+        columns: list = None,
+    ):
+        return self._signals_range(
+            "GetDailyAverageSpeed",
+            DAILY_AVERAGE_SPEED_FIELDS,
+            vehicle_jwt,
+            token_id,
+            start_date,
+            end_date,
+            window=window,
+            max_workers=max_workers,
+            output=output,
+            columns=columns,
+        )
+
+    # Sample query - daily max speed of a specific vehicle
+    def get_daily_max_speed(
+        self,
+        vehicle_jwt: str,
+        token_id: int,
+        start_date: str,
+        end_date: str,
+        window=None,
+        max_workers: int = 4,
+        output: str = "json",
+        columns: list = None,
+    ):
+        return self._signals_range(
+            "GetMaxSpeed",
+            DAILY_MAX_SPEED_FIELDS,
+            vehicle_jwt,
+            token_id,
+            start_date,
+            end_date,
+            window=window,
+            max_workers=max_workers,
+            output=output,
+            columns=columns,
         )
 
     # Sample query - get the VIN of a specific vehicle
@@ -166,3 +431,141 @@ class Telemetry:
 
         except Exception as error:
             raise Exception(f"Error getting VIN: {str(error)}")
+
+
+class AsyncTelemetry(Telemetry):
+
+    async def get_vin(self, vehicle_jwt: str, token_id: int):
+        try:
+            attestation_response = await self.dimo.attestation.create_vin_vc(
+                vehicle_jwt=vehicle_jwt, token_id=token_id
+            )
+            if (
+                attestation_response["message"]
+                == "VC generated successfully. Retrieve using the provided GQL URL and query parameter."
+            ):
+                query = """
+                query GetLatestVinVC($tokenId: Int!) {
+                    vinVCLatest(tokenId: $tokenId) {
+                        vin
+                    }
+                }
+                """
+                variables = {"tokenId": token_id}
+
+                return await self.dimo.query(
+                    "Telemetry", query, token=vehicle_jwt, variables=variables
+                )
+            else:
+                return "There was an error generating a VIN VC. Please check your credentials and try again."
+
+        except Exception as error:
+            raise Exception(f"Error getting VIN: {str(error)}")
+
+    async def get_signals_latest_many(
+        self, vehicles: list, batch_size: int = 25, max_workers: int = 32
+    ) -> SignalsLatestBatch:
+        check_type("max_workers", max_workers, int)
+
+        async def run_batch(batch):
+            vehicle_jwt, token_ids = batch
+            query, variables = self._signals_latest_batch_query(token_ids)
+            started = time.perf_counter()
+            try:
+                response = await self.dimo.query(
+                    "Telemetry", query, token=vehicle_jwt, variables=variables
+                )
+            except Exception as e:
+                return None, time.perf_counter() - started, e
+            return response, time.perf_counter() - started, None
+
+        results = SignalsLatestBatch()
+        batches = self._signals_latest_batches(vehicles, batch_size)
+        async for outcome in arun_bounded(run_batch, batches, max_workers):
+            self._collect_signals_latest(results, outcome)
+        return results
+
+    async def iter_signals(
+        self,
+        vehicle_jwt: str,
+        token_id: int,
+        fields: str,
+        start_date,
+        end_date,
+        interval: str = "24h",
+        window="720h",
+        filter: str = None,
+        max_workers: int = 4,
+    ):
+        check_type("vehicle_jwt", vehicle_jwt, str)
+        check_type("token_id", token_id, int)
+        self._check_window_fields(fields)
+        windows = plan_windows(start_date, end_date, interval, window)
+        query = self._signals_query("GetSignalsWindow", fields, interval, filter)
+
+        async def fetch(window):
+            response = await self.dimo.query(
+                "Telemetry",
+                query,
+                token=vehicle_jwt,
+                variables=self._window_variables(token_id, window),
+            )
+            return self._window_rows(response, window)
+
+        async for rows in amap_ordered(fetch, windows, max_workers):
+            for row in rows:
+                yield row
+
+    async def query(
+        self, query, vehicle_jwt, output="json", columns=None, field="signals"
+    ):
+        if output == "raw":
+            return await self.dimo.query(
+                "Telemetry", query, token=vehicle_jwt, raw=True
+            )
+        check_output(output)
+        response = await self.dimo.query("Telemetry", query, token=vehicle_jwt)
+        return self._format_signals(response, output, columns, field)
+
+    async def _signals_range(
+        self,
+        name,
+        fields,
+        vehicle_jwt,
+        token_id,
+        start_date,
+        end_date,
+        filter=None,
+        window=None,
+        max_workers=4,
+        output="json",
+        columns=None,
+    ):
+        check_output(output)
+        if window is None:
+            variables = {
+                "tokenId": token_id,
+                "startDate": start_date,
+                "endDate": end_date,
+            }
+            response = await self.dimo.query(
+                "Telemetry",
+                self._signals_query(name, fields, filter=filter),
+                token=vehicle_jwt,
+                variables=variables,
+            )
+            return self._format_signals(response, output, columns)
+        rows = self.iter_signals(
+            vehicle_jwt,
+            token_id,
+            fields,
+            start_date,
+            end_date,
+            window=window,
+            filter=filter,
+            max_workers=max_workers,
+        )
+        rows = [row async for row in rows]
+        if output == "columns":
+            return to_columns(rows, columns)
+        return {"data": {"signals": rows}}
@@ -0,0 +1,152 @@
+import bisect
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, NamedTuple, Optional
+
+_OPERATION_NAME = re.compile(r"^\s*(?:query|mutation|subscription)\s+(\w+)")
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+# Returns the operation name of a GraphQL document, or None for anonymous queries
+def graphql_operation_name(query: str) -> Optional[str]:
+    match = _OPERATION_NAME.match(query or "")
+    return match.group(1) if match else None
+
+
+# Collapses numeric path segments so per-vehicle URLs share one endpoint name
+def endpoint_name(path: str) -> str:
+    return _NUMERIC_SEGMENT.sub("/:id", path or "/")
+
+
+# Emitted to every hook once per call, after retries. timings holds "total" (whole
+# call including retries and backoff), "server" (request sent until response headers
+# for the last attempt, as reported by the HTTP client) and "decode" (JSON parsing).
+# Calls answered from a fresh ResponseCache entry have cached=True and status None.
+class RequestEvent(NamedTuple):
+    service: Optional[str]
+    method: str
+    url: str
+    endpoint: str
+    status: Optional[int]
+    timings: Dict[str, float]
+    request_bytes: int
+    response_bytes: int
+    retries: int
+    error: Optional[BaseException]
+    cached: bool = False
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Series:
+
+    def __init__(self, buckets, reservoir_size):
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.samples = deque(maxlen=reservoir_size)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.cache_hits = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+# In-memory latency histogram usable as a hook: DIMO(hooks=[LatencyHistogram()]).
+# Keeps cumulative Prometheus-style buckets plus a bounded reservoir of recent
+# samples per (service, endpoint) for p50/p95/p99.
+class LatencyHistogram:
+
+    def __init__(
+        self, buckets: Iterable[float] = DEFAULT_BUCKETS, reservoir_size: int = 2048
+    ):
+        self.buckets = tuple(sorted(buckets))
+        self.reservoir_size = reservoir_size
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: RequestEvent) -> None:
+        key = (event.service or "", event.endpoint)
+        elapsed = event.timings.get("total", 0.0)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.buckets, self.reservoir_size)
+            series.bucket_counts[bisect.bisect_left(self.buckets, elapsed)] += 1
+            series.samples.append(elapsed)
+            series.count += 1
+            series.total += elapsed
+            series.request_bytes += event.request_bytes
+            series.response_bytes += event.response_bytes
+            if event.error is not None:
+                series.errors += 1
+            if event.cached:
+                series.cache_hits += 1
+
+    @staticmethod
+    def _quantile(samples, q):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    # {service: {"count", "p50", "p95", "p99"}}, or per (service, endpoint) with by_endpoint
+    def percentiles(self, by_endpoint: bool = False) -> dict:
+        grouped = {}
+        with self._lock:
+            for (service, endpoint), series in self._series.items():
+                key = (service, endpoint) if by_endpoint else service
+                samples, count = grouped.get(key, ([], 0))
+                grouped[key] = (samples + list(series.samples), count + series.count)
+        return {
+            key: {
+                "count": count,
+                "p50": self._quantile(samples, 0.50),
+                "p95": self._quantile(samples, 0.95),
+                "p99": self._quantile(samples, 0.99),
+            }
+            for key, (samples, count) in grouped.items()
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    # Renders the collected series in the Prometheus text exposition format
+    def to_prometheus(self, prefix: str = "dimo_request") -> str:
+        lines = [
+            f"# TYPE {prefix}_duration_seconds histogram",
+        ]
+        counters = []
+        with self._lock:
+            for (service, endpoint), series in sorted(self._series.items()):
+                labels = f'service="{service}",endpoint="{endpoint}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, series.bucket_counts):
+                    cumulative += count
+                    lines.append(
+                        f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'{prefix}_duration_seconds_bucket{{{labels},le="+Inf"}} {series.count}'
+                )
+                lines.append(
+                    f"{prefix}_duration_seconds_sum{{{labels}}} {series.total}"
+                )
+                lines.append(
+                    f"{prefix}_duration_seconds_count{{{labels}}} {series.count}"
+                )
+                counters.append((labels, series))
+        for name, attribute in (
+            ("errors_total", "errors"),
+            ("cache_hits_total", "cache_hits"),
+            ("sent_bytes_total", "request_bytes"),
+            ("received_bytes_total", "response_bytes"),
+        ):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for labels, series in counters:
+                lines.append(
+                    f"{prefix}_{name}{{{labels}}} {getattr(series, attribute)}"
+                )
+        return "\n".join(lines) + "\n"
@@ -1,13 +1,119 @@
+from typing import Iterable, Iterator, List, Union
+
+PRIVILEGE_COUNT = 128
+
+# SACD permissions grant privilege i when bits 2i and 2i+1 are both set
+_EVEN_BITS = int("01" * PRIVILEGE_COUNT, 2)
+_PERMISSION_MASK = (1 << 2 * PRIVILEGE_COUNT) - 1
+
+
+# Maps a byte of "granted" flags, which sit on the even bits 0, 2, 4 and 6, to the
+# four privileges it covers packed into the low nibble
+def _build_pair_table() -> bytes:
+    table = bytearray(256)
+    for value in range(256):
+        packed = 0
+        for pair in range(4):
+            if value >> (pair * 2) & 1:
+                packed |= 1 << pair
+        table[value] = packed
+    return bytes(table)
+
+
+_PAIR_TABLE = _build_pair_table()
+
+
+# Immutable set of privilege ids backed by one int, bit i meaning privilege i is
+# granted. Membership, has_all/has_any and set algebra are single int operations.
+class PrivilegeSet:
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    @classmethod
+    def of(cls, privileges: Iterable[int]) -> "PrivilegeSet":
+        if isinstance(privileges, PrivilegeSet):
+            return privileges
+        bits = 0
+        for privilege in privileges:
+            bits |= 1 << privilege
+        return cls(bits)
+
+    def has_all(self, privileges: Union["PrivilegeSet", Iterable[int]]) -> bool:
+        required = PrivilegeSet.of(privileges).bits
+        return self.bits & required == required
+
+    def has_any(self, privileges: Union["PrivilegeSet", Iterable[int]]) -> bool:
+        return bool(self.bits & PrivilegeSet.of(privileges).bits)
+
+    def __contains__(self, privilege: int) -> bool:
+        return bool(self.bits >> privilege & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def __len__(self) -> int:
+        return bin(self.bits).count("1")
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def __int__(self) -> int:
+        return self.bits
+
+    def __and__(self, other: "PrivilegeSet") -> "PrivilegeSet":
+        return PrivilegeSet(self.bits & PrivilegeSet.of(other).bits)
+
+    def __or__(self, other: "PrivilegeSet") -> "PrivilegeSet":
+        return PrivilegeSet(self.bits | PrivilegeSet.of(other).bits)
+
+    def __sub__(self, other: "PrivilegeSet") -> "PrivilegeSet":
+        return PrivilegeSet(self.bits & ~PrivilegeSet.of(other).bits)
+
+    def __xor__(self, other: "PrivilegeSet") -> "PrivilegeSet":
+        return PrivilegeSet(self.bits ^ PrivilegeSet.of(other).bits)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PrivilegeSet):
+            return self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __repr__(self) -> str:
+        return f"PrivilegeSet({list(self)})"
+
+    def to_list(self) -> List[int]:
+        return list(self)
+
+
 class PermissionDecoder:
     @staticmethod
     def decode_permission_bits(permission_hex: str) -> list:
-        clean_hex = permission_hex.lower().replace("0x", "")
-        permission_bits = int(clean_hex, 16)
+        return PermissionDecoder.decode_privilege_set(permission_hex).to_list()
 
-        granted_permissions = []
+    # Keeps the bit pairs that are fully set, then packs them through _PAIR_TABLE with
+    # bytes.translate, so no Python-level loop runs per privilege
+    @staticmethod
+    def decode_privilege_set(permission_hex: str) -> PrivilegeSet:
+        clean_hex = permission_hex.lower().replace("0x", "")
+        permission_bits = int(clean_hex, 16) & _PERMISSION_MASK
+        granted = permission_bits & (permission_bits >> 1) & _EVEN_BITS
+        packed = granted.to_bytes(2 * PRIVILEGE_COUNT // 8, "little").translate(
+            _PAIR_TABLE
+        )
+        low = int.from_bytes(packed[0::2], "little")
+        high = int.from_bytes(packed[1::2], "little")
+        return PrivilegeSet(low | high << 4)
 
-        for i in range(128):
-            bit_pair = (permission_bits >> i * 2) & 0b11
-            if bit_pair == 0b11:
-                granted_permissions.append(i)
-        return granted_permissions
+    @staticmethod
+    def decode_many(permission_hexes: Iterable[str]) -> List[PrivilegeSet]:
+        decode = PermissionDecoder.decode_privilege_set
+        return [decode(permission_hex) for permission_hex in permission_hexes]
@@ -0,0 +1,368 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from dimo.concurrency import arun_bounded, run_bounded
+from dimo.errors import DimoValueError, check_optional_type, check_type
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable
+    service: Optional[str]
+    max_workers: int
+    provides_jwt: bool = False
+
+
+# Per-vehicle state handed to every stage: the vehicle JWT once exchanged, and the
+# results of the stages that already ran
+class VehicleRun:
+
+    __slots__ = ("token_id", "vehicle_jwt", "results")
+
+    def __init__(self, token_id: int, vehicle_jwt: str = None):
+        self.token_id = token_id
+        self.vehicle_jwt = vehicle_jwt
+        self.results: Dict[str, Any] = {}
+
+
+class VehicleResult(NamedTuple):
+    token_id: int
+    results: Dict[str, Any]
+    error: Optional[BaseException]
+    failed_stage: Optional[str]
+    elapsed: float
+
+
+class StageStats(NamedTuple):
+    active: int
+    completed: int
+    failed: int
+    seconds: float
+
+
+class PipelineProgress(NamedTuple):
+    started: int
+    completed: int
+    failed: int
+    in_flight: int
+    stages: Dict[str, StageStats]
+
+
+# Thread-safe counters behind FleetPipeline.progress()
+class _Progress:
+
+    def __init__(self, stage_names):
+        self._lock = threading.Lock()
+        self.started = self.completed = self.failed = 0
+        self._stages = {name: [0, 0, 0, 0.0] for name in stage_names}
+
+    def vehicle_started(self):
+        with self._lock:
+            self.started += 1
+
+    def vehicle_finished(self, failed: bool):
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stage_started(self, name: str):
+        with self._lock:
+            self._stages[name][0] += 1
+
+    def stage_finished(self, name: str, failed: bool, seconds: float):
+        with self._lock:
+            stats = self._stages[name]
+            stats[0] -= 1
+            stats[2 if failed else 1] += 1
+            stats[3] += seconds
+
+    def snapshot(self) -> PipelineProgress:
+        with self._lock:
+            return PipelineProgress(
+                self.started,
+                self.completed,
+                self.failed,
+                self.started - self.completed - self.failed,
+                {name: StageStats(*stats) for name, stats in self._stages.items()},
+            )
+
+
+# Runs per-vehicle stages, e.g. token exchange -> telemetry -> valuations, across a
+# fleet. Every stage has its own bound on concurrent calls and service_limits caps the
+# calls in flight per DIMO service across stages. Vehicles move through the stages
+# independently, so while one vehicle is being valued the next ones are already
+# exchanging tokens or querying telemetry, and a fleet takes about as long as its
+# slowest stage needs for all vehicles. A failing stage ends that vehicle only.
+class FleetPipeline:
+
+    def __init__(self, dimo_instance, service_limits: Dict[str, int] = None):
+        self.dimo = dimo_instance
+        self.stages = []
+        self.service_limits = dict(service_limits or {})
+        self._progress = _Progress(())
+
+    def add_stage(
+        self,
+        name: str,
+        fn: Callable,
+        service: str = None,
+        max_workers: int = 8,
+        provides_jwt: bool = False,
+    ) -> "FleetPipeline":
+        check_type("name", name, str)
+        check_type("max_workers", max_workers, int)
+        check_optional_type("service", service, str)
+        if max_workers < 1:
+            raise DimoValueError("max_workers must be at least 1")
+        if any(stage.name == name for stage in self.stages):
+            raise DimoValueError(f"Pipeline already has a stage named {name!r}")
+        self.stages.append(Stage(name, fn, service, max_workers, provides_jwt))
+        return self
+
+    # Gets the Vehicle JWT later stages use. Exchanged tokens go through the token
+    # exchange cache, so repeated runs reuse JWTs that are still valid.
+    def exchange(
+        self,
+        developer_jwt: str = None,
+        client_id: str = None,
+        privileges: list = None,
+        env: str = "Production",
+        max_workers: int = 16,
+        name: str = "exchange",
+    ) -> "FleetPipeline":
+        def run(vehicle):
+            return self.dimo.token_exchange.exchange(
+                developer_jwt,
+                token_id=vehicle.token_id,
+                client_id=client_id,
+                env=env,
+                privileges=privileges,
+            )
+
+        return self.add_stage(name, run, "TokenExchange", max_workers, True)
+
+    # Runs a Telemetry query for the vehicle. Without a query this is
+    # telemetry.get_signals_latest, otherwise variables default to {"tokenId": ...}.
+    def telemetry(
+        self,
+        name: str,
+        query: str = None,
+        variables: Callable = None,
+        max_workers: int = 16,
+    ) -> "FleetPipeline":
+        def run(vehicle):
+            if query is None:
+                return self.dimo.telemetry.get_signals_latest(
+                    vehicle.vehicle_jwt, vehicle.token_id
+                )
+            query_variables = (
+                variables(vehicle) if variables else {"tokenId": vehicle.token_id}
+            )
+            return self.dimo.query(
+                "Telemetry", query, query_variables, token=vehicle.vehicle_jwt
+            )
+
+        return self.add_stage(name, run, "Telemetry", max_workers)
+
+    def valuations(
+        self, max_workers: int = 8, name: str = "valuations"
+    ) -> "FleetPipeline":
+        def run(vehicle):
+            return self.dimo.valuations.get_valuations(
+                vehicle.vehicle_jwt, vehicle.token_id
+            )
+
+        return self.add_stage(name, run, "Valuations", max_workers)
+
+    # Progress of the most recent run, see PipelineRun.progress for a given run
+    def progress(self) -> PipelineProgress:
+        return self._progress.snapshot()
+
+    # Enough vehicles in flight to keep every stage busy
+    def _default_in_flight(self) -> int:
+        return sum(stage.max_workers for stage in self.stages)
+
+    # Validates the run arguments and every vehicle before any stage starts, so a bad
+    # item cannot stop a run half way through the fleet
+    def _prepare(self, vehicles, max_in_flight):
+        if not self.stages:
+            raise DimoValueError("Pipeline has no stages")
+        if max_in_flight is None:
+            max_in_flight = self._default_in_flight()
+        check_type("max_in_flight", max_in_flight, int)
+        vehicles = [self._vehicle(item) for item in vehicles]
+        self._progress = _Progress([stage.name for stage in self.stages])
+        return vehicles, max_in_flight, self._progress
+
+    def _vehicle(self, item) -> VehicleRun:
+        if isinstance(item, VehicleRun):
+            vehicle = item
+        elif isinstance(item, tuple):
+            if len(item) != 2:
+                raise DimoValueError(
+                    f"Vehicle pairs must be (token_id, vehicle_jwt), got {item!r}"
+                )
+            vehicle = VehicleRun(*item)
+            check_optional_type("vehicle_jwt", vehicle.vehicle_jwt, str)
+        else:
+            vehicle = VehicleRun(item)
+        check_type("token_id", vehicle.token_id, int)
+        return vehicle
+
+    def _stage_finished(self, progress, vehicle, stage, result, started, error):
+        progress.stage_finished(
+            stage.name, error is not None, time.perf_counter() - started
+        )
+        if error is None:
+            vehicle.results[stage.name] = result
+
+    def _result(self, progress, vehicle, started, error=None, failed_stage=None):
+        progress.vehicle_finished(error is not None)
+        return VehicleResult(
+            vehicle.token_id,
+            vehicle.results,
+            error,
+            failed_stage,
+            time.perf_counter() - started,
+        )
+
+    def _process(
+        self, vehicle, progress, stage_limits, service_limits
+    ) -> VehicleResult:
+        started = time.perf_counter()
+        progress.vehicle_started()
+        for stage in self.stages:
+            if stage.provides_jwt and vehicle.vehicle_jwt is not None:
+                continue
+            service_limit = service_limits.get(stage.service)
+            with stage_limits[stage.name]:
+                if service_limit is not None:
+                    service_limit.acquire()
+                stage_started = time.perf_counter()
+                progress.stage_started(stage.name)
+                try:
+                    result, error = stage.fn(vehicle), None
+                    if stage.provides_jwt:
+                        vehicle.vehicle_jwt = result["token"]
+                except Exception as e:
+                    result, error = None, e
+                finally:
+                    if service_limit is not None:
+                        service_limit.release()
+            self._stage_finished(progress, vehicle, stage, result, stage_started, error)
+            if error is not None:
+                return self._result(progress, vehicle, started, error, stage.name)
+        return self._result(progress, vehicle, started)
+
+    # Runs the stages for every vehicle and returns a PipelineRun that yields a
+    # VehicleResult per vehicle as soon as it is done. vehicles are token ids,
+    # (token_id, vehicle_jwt) pairs to skip the exchange or VehicleRun objects.
+    def run(self, vehicles: Iterable, max_in_flight: int = None) -> "PipelineRun":
+        vehicles, max_in_flight, progress = self._prepare(vehicles, max_in_flight)
+        stage_limits = {
+            stage.name: threading.BoundedSemaphore(stage.max_workers)
+            for stage in self.stages
+        }
+        service_limits = {
+            service: threading.BoundedSemaphore(limit)
+            for service, limit in self.service_limits.items()
+        }
+
+        def process(vehicle):
+            return self._process(vehicle, progress, stage_limits, service_limits)
+
+        def results():
+            for outcome in run_bounded(process, vehicles, max_in_flight):
+                if outcome.error is not None:
+                    raise outcome.error
+                yield outcome.result
+
+        return PipelineRun(results(), progress)
+
+
+# One run of a FleetPipeline. Iterating it yields the VehicleResults, and progress()
+# only counts the vehicles of this run, so runs on the same pipeline can overlap.
+class PipelineRun:
+
+    def __init__(self, results, progress: _Progress):
+        self._results = results
+        self._progress = progress
+
+    def __iter__(self) -> "PipelineRun":
+        return self
+
+    def __next__(self) -> VehicleResult:
+        return next(self._results)
+
+    def progress(self) -> PipelineProgress:
+        return self._progress.snapshot()
+
+
+# PipelineRun of an AsyncFleetPipeline, consumed with "async for"
+class AsyncPipelineRun(PipelineRun):
+
+    def __aiter__(self) -> "AsyncPipelineRun":
+        return self
+
+    async def __anext__(self) -> VehicleResult:
+        return await self._results.__anext__()
+
+
+# asyncio counterpart of FleetPipeline, stage functions return awaitables
+class AsyncFleetPipeline(FleetPipeline):
+
+    async def _process(
+        self, vehicle, progress, stage_limits, service_limits
+    ) -> VehicleResult:
+        started = time.perf_counter()
+        progress.vehicle_started()
+        for stage in self.stages:
+            if stage.provides_jwt and vehicle.vehicle_jwt is not None:
+                continue
+            service_limit = service_limits.get(stage.service)
+            async with stage_limits[stage.name]:
+                if service_limit is not None:
+                    await service_limit.acquire()
+                stage_started = time.perf_counter()
+                progress.stage_started(stage.name)
+                try:
+                    result, error = await stage.fn(vehicle), None
+                    if stage.provides_jwt:
+                        vehicle.vehicle_jwt = result["token"]
+                except Exception as e:
+                    result, error = None, e
+                finally:
+                    if service_limit is not None:
+                        service_limit.release()
+            self._stage_finished(progress, vehicle, stage, result, stage_started, error)
+            if error is not None:
+                return self._result(progress, vehicle, started, error, stage.name)
+        return self._result(progress, vehicle, started)
+
+    def run(self, vehicles: Iterable, max_in_flight: int = None) -> AsyncPipelineRun:
+        import asyncio
+
+        vehicles, max_in_flight, progress = self._prepare(vehicles, max_in_flight)
+
+        async def results():
+            stage_limits = {
+                stage.name: asyncio.Semaphore(stage.max_workers)
+                for stage in self.stages
+            }
+            service_limits = {
+                service: asyncio.Semaphore(limit)
+                for service, limit in self.service_limits.items()
+            }
+
+            def process(vehicle):
+                return self._process(vehicle, progress, stage_limits, service_limits)
+
+            async for outcome in arun_bounded(process, vehicles, max_in_flight):
+                if outcome.error is not None:
+                    raise outcome.error
+                yield outcome.result
+
+        return AsyncPipelineRun(results(), progress)
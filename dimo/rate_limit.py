@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from typing import Dict, Optional, Union
+
+from dimo.environments import dimo_environment
+from dimo.errors import DimoError, DimoValueError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+# Token bucket refilled at `rate` tokens per second up to `burst`. Callers reserve
+# tokens up front and wait out the deficit, so the bucket works the same from
+# threads (acquire) and from asyncio (acquire_async) without blocking the lock.
+class TokenBucket:
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise DimoValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Takes tokens and returns how many seconds the caller has to wait for them
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            return max(-self._tokens / self.rate, 0.0)
+
+    def acquire(self, tokens: float = 1) -> None:
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        import asyncio
+
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# Token bucket whose state lives in a local file guarded by an advisory lock, so
+# every process on the host pointing at the same path shares one limit.
+class FileTokenBucket(TokenBucket):
+
+    def __init__(self, path: str, rate: float, burst: Optional[float] = None):
+        if fcntl is None:
+            raise DimoError("FileTokenBucket requires fcntl (POSIX only).")
+        super().__init__(rate, burst)
+        self.path = path
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock, open(self.path, "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                try:
+                    state = json.loads(handle.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = time.time()
+                available = state.get("tokens", self.burst)
+                updated = state.get("updated", now)
+                available = min(self.burst, available + (now - updated) * self.rate)
+                available -= tokens
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps({"tokens": available, "updated": now}))
+                handle.flush()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+        return max(-available / self.rate, 0.0)
+
+
+BucketSpec = Union[float, int, tuple, TokenBucket]
+
+
+# One token bucket per DIMO service, e.g. {"Telemetry": 20, "Identity": (10, 20)}.
+# A number is a rate per second, a tuple is (rate, burst), and a TokenBucket
+# (such as a FileTokenBucket shared between processes) is used as is.
+class RateLimiter:
+
+    def __init__(self, limits: Dict[str, BucketSpec]):
+        services = {service for env in dimo_environment.values() for service in env}
+        self.buckets = {}
+        for service, spec in limits.items():
+            if service not in services:
+                raise DimoValueError(
+                    f"Unknown DIMO service {service!r}. Expected one of: {', '.join(sorted(services))}"
+                )
+            self.buckets[service] = self._bucket(spec)
+
+    def _bucket(self, spec: BucketSpec) -> TokenBucket:
+        if isinstance(spec, TokenBucket):
+            return spec
+        if isinstance(spec, tuple):
+            return TokenBucket(*spec)
+        return TokenBucket(spec)
+
+    def bucket(self, service: str) -> Optional[TokenBucket]:
+        return self.buckets.get(service)
+
+    def acquire(self, service: str, tokens: float = 1) -> None:
+        bucket = self.buckets.get(service)
+        if bucket is not None:
+            bucket.acquire(tokens)
+
+    async def acquire_async(self, service: str, tokens: float = 1) -> None:
+        bucket = self.buckets.get(service)
+        if bucket is not None:
+            await bucket.acquire_async(tokens)
@@ -1,16 +1,55 @@
-import json
+import time
+import warnings
 import requests
+from urllib.parse import urlsplit
 
+from .codec import default_codec
+from .instrumentation import RequestEvent, endpoint_name
+from .transport import HTTPXTransport, RequestsTransport
 
-class Request:
 
-    session = requests.Session()
+# One call through the transport of the DIMO client that owns it, which keeps the
+# connection pool. Without a session the call gets a fresh RequestsTransport.
+class Request:
 
-    def __init__(self, http_method, url):
+    def __init__(
+        self,
+        http_method,
+        url,
+        retry_policy=None,
+        circuit_breaker=None,
+        idempotent=None,
+        rate_limit=None,
+        hooks=(),
+        service=None,
+        endpoint=None,
+        session=None,
+        timeout=None,
+        codec=None,
+        raw=False,
+        cache=None,
+        cacheable=None,
+    ):
+        self.session = session if session is not None else RequestsTransport()
+        self.timeout = timeout
+        self.codec = codec or default_codec()
+        self.raw = raw
+        self.cache = cache
+        self.cacheable = cacheable
+        self._cache_store = self._cache_key = self._cache_entry = None
         self.http_method = http_method
         self.url = url
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.idempotent = idempotent
+        self.rate_limit = rate_limit
+        self.hooks = hooks
+        self.service = service
+        self.endpoint = endpoint
+        self.retries = 0
 
-    def __call__(self, headers=None, data=None, params=None, **kwargs):
+    # Merges headers and serializes JSON bodies before sending
+    def _prepare(self, headers, data, kwargs):
         headers = headers or {}
         headers.update(kwargs.pop("headers", {}))
 
@@ -19,20 +58,259 @@ class Request:
             and isinstance(data, dict)
             and headers.get("Content-Type") == "application/json"
         ):
-            data = json.dumps(data)
+            data = self.codec.dumps(data)
+        return headers, data
+
+    # raw=True hands back the undecoded body bytes
+    def _decode(self, body):
+        if self.raw:
+            return body
+        if body:
+            return self.codec.loads(body)
+        return None
+
+    def _parse(self, response):
+        if self._cache_store is not None:
+            return self._store_response(response)
+
+        # TODO: Better error responses
+        response.raise_for_status()
+        return self._decode(response.content)
+
+    def _endpoint_name(self):
+        return self.endpoint or endpoint_name(urlsplit(self.url).path)
+
+    # Only GETs and calls marked idempotent (GraphQL queries) are cached, unless the
+    # route says otherwise
+    def _is_cacheable(self):
+        if self.cacheable is not None:
+            return self.cacheable
+        return self.http_method.upper() == "GET" or self.idempotent is True
+
+    # Returns the cached body if it is still fresh. Otherwise remembers the entry and
+    # returns headers asking the server to revalidate it.
+    def _lookup_cache(self, headers, params, data):
+        if self.cache is None or not self._is_cacheable():
+            return headers, None
+        self._cache_store = self.cache.store(self.service, self._endpoint_name())
+        if self._cache_store is None:
+            return headers, None
+        self._cache_key = self.cache.key(
+            self.http_method, self.url, headers, params, data
+        )
+        entry = self._cache_entry = self._cache_store.get(self._cache_key)
+        if entry is None:
+            return headers, None
+        if entry.is_fresh():
+            return headers, entry.body
+        if entry.etag:
+            headers = dict(headers, **{"If-None-Match": entry.etag})
+        return headers, None
+
+    # GraphQL reports failures as a 200 with an errors list, which must not be cached
+    @staticmethod
+    def _has_errors(decoded):
+        return isinstance(decoded, dict) and bool(decoded.get("errors"))
+
+    # Returns the decoded body, storing it first unless it carries GraphQL errors
+    def _store_response(self, response):
+        if response.status_code == 304 and self._cache_entry is not None:
+            self._cache_store.revalidate(self._cache_key, self._cache_entry)
+            return self._decode(self._cache_entry.body)
+        response.raise_for_status()
+        body = response.content
+        result = self._decode(body)
+        if self.raw:
+            decoded = self.codec.loads(body) if b'"errors"' in body else None
+        else:
+            decoded = result
+        if not self._has_errors(decoded):
+            self._cache_store.put(self._cache_key, body, response.headers.get("ETag"))
+        return result
+
+    def _is_transport_error(self, error):
+        transport_errors = getattr(
+            self.session,
+            "transport_errors",
+            (requests.ConnectionError, requests.Timeout),
+        )
+        return isinstance(error, transport_errors)
+
+    # Returns how long to wait before retrying after a transport error, or None to give up
+    def _retry_error_delay(self, error, attempt):
+        if not self._is_transport_error(error):
+            return None
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+        if self.retry_policy is None:
+            return None
+        if not self.retry_policy.allows(self.http_method, self.idempotent, attempt):
+            return None
+        return self.retry_policy.delay_for(attempt)
+
+    # Returns how long to wait before retrying a response, or None to hand it back
+    def _retry_response_delay(self, response, attempt):
+        if self.circuit_breaker is not None:
+            if response.status_code >= 500:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+        if self.retry_policy is None:
+            return None
+        if not self.retry_policy.is_retryable_status(response.status_code):
+            return None
+        if not self.retry_policy.allows(self.http_method, self.idempotent, attempt):
+            return None
+        return self.retry_policy.delay_for(attempt, response.headers)
 
-        response = self.session.request(
+    # Sends the request, retrying per retry_policy. self.retries counts the retries made.
+    def _send(self, headers, data, params, kwargs):
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_call()
+            if self.rate_limit is not None:
+                self.rate_limit.acquire()
+            try:
+                response = self.session.request(
+                    method=self.http_method,
+                    url=self.url,
+                    headers=headers,
+                    params=params,
+                    data=data,
+                    **kwargs,
+                )
+            except Exception as e:
+                delay = self._retry_error_delay(e, self.retries)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_response_delay(response, self.retries)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            self.retries += 1
+
+    def _emit(self, started, data, response, decode_time, error):
+        timings = {"total": time.perf_counter() - started}
+        try:
+            elapsed = getattr(response, "elapsed", None)
+        except RuntimeError:
+            # httpx only knows the elapsed time once the body has been read
+            elapsed = None
+        if elapsed is not None:
+            timings["server"] = elapsed.total_seconds()
+        if decode_time is not None:
+            timings["decode"] = decode_time
+        event = RequestEvent(
+            service=self.service,
             method=self.http_method,
             url=self.url,
-            headers=headers,
-            params=params,
-            data=data,
-            **kwargs,
+            endpoint=self._endpoint_name(),
+            status=response.status_code if response is not None else None,
+            timings=timings,
+            request_bytes=len(data) if isinstance(data, (str, bytes)) else 0,
+            response_bytes=len(response.content) if response is not None else 0,
+            retries=self.retries,
+            error=error,
         )
+        self._notify(event)
 
-        # TODO: Better error responses
-        response.raise_for_status()
+    # Reports a call answered from a fresh cache entry, which never reached the network
+    def _emit_cached(self, started, data, body, decode_time):
+        self._notify(
+            RequestEvent(
+                service=self.service,
+                method=self.http_method,
+                url=self.url,
+                endpoint=self._endpoint_name(),
+                status=None,
+                timings={
+                    "total": time.perf_counter() - started,
+                    "decode": decode_time,
+                },
+                request_bytes=len(data) if isinstance(data, (str, bytes)) else 0,
+                response_bytes=len(body),
+                retries=0,
+                error=None,
+                cached=True,
+            )
+        )
 
-        if response.content:
-            return response.json()
-        return None
+    def _cached_result(self, started, data, body):
+        if not self.hooks:
+            return self._decode(body)
+        decode_started = time.perf_counter()
+        result = self._decode(body)
+        self._emit_cached(started, data, body, time.perf_counter() - decode_started)
+        return result
+
+    def _notify(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                warnings.warn(f"DIMO request hook {hook!r} failed: {e!r}")
+
+    def __call__(self, headers=None, data=None, params=None, **kwargs):
+        headers, data = self._prepare(headers, data, kwargs)
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        headers, cached = self._lookup_cache(headers, params, data)
+        if cached is not None:
+            return self._cached_result(started, data, cached)
+
+        if not self.hooks:
+            return self._parse(self._send(headers, data, params, kwargs))
+
+        response = decode_time = error = None
+        try:
+            response = self._send(headers, data, params, kwargs)
+            decode_started = time.perf_counter()
+            result = self._parse(response)
+            decode_time = time.perf_counter() - decode_started
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit(started, data, response, decode_time, error)
+
+
+# Builds the default transport and connection pool owned by one DIMO client. timeout is
+# a number or a (connect, read) tuple. http2=True needs httpx with HTTP/2 support
+# installed.
+def create_session(
+    pool_connections=10,
+    pool_maxsize=10,
+    pool_block=False,
+    keep_alive=True,
+    timeout=None,
+    http2=False,
+):
+    if http2:
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "HTTP/2 requires httpx. Install it with: pip install 'dimo-python-sdk[http2]'"
+            ) from e
+        limits = httpx.Limits(
+            max_connections=pool_maxsize * pool_connections,
+            max_keepalive_connections=pool_maxsize if keep_alive else 0,
+        )
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        return HTTPXTransport(httpx.Client(http2=True, limits=limits, timeout=timeout))
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return RequestsTransport(session)
@@ -0,0 +1,151 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from dimo.errors import DimoValueError
+
+
+# ttl is how long a response is served without asking the server. Once it expires a
+# response that came with an ETag is revalidated with If-None-Match instead of
+# being refetched. max_bytes caps the response bytes held for the endpoint.
+class CachePolicy(NamedTuple):
+    ttl: float
+    max_entries: int = 1024
+    max_bytes: Optional[int] = None
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    expires_at: float
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+# LRU store for one endpoint
+class _EndpointCache:
+
+    def __init__(self, policy: CachePolicy):
+        self.policy = policy
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.is_fresh():
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key: str, body: bytes, etag: Optional[str]) -> None:
+        if self.policy.max_bytes is not None and len(body) > self.policy.max_bytes:
+            return
+        entry = CacheEntry(body, etag, time.monotonic() + self.policy.ttl)
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self.entries[key] = entry
+            self.size += len(body)
+            while len(self.entries) > self.policy.max_entries or (
+                self.policy.max_bytes is not None and self.size > self.policy.max_bytes
+            ):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.evictions += 1
+
+    # A 304 keeps the stored body and starts a new ttl
+    def revalidate(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self.revalidated += 1
+            if key in self.entries:
+                self.entries[key] = entry._replace(
+                    expires_at=time.monotonic() + self.policy.ttl
+                )
+                self.entries.move_to_end(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.size,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+
+# Opt-in cache for read-only calls, e.g.
+#   ResponseCache({"Identity:MMYByTokenID": CachePolicy(ttl=3600),
+#                  "DeviceDefinitions": CachePolicy(ttl=600, max_bytes=8_000_000)})
+# Policies are keyed by "<service>:<endpoint>" or by service alone, where endpoint is
+# the name hooks see in RequestEvent.endpoint (GraphQL operation name or normalized
+# path). Entries are keyed by method, URL, params, body and the Authorization header,
+# so responses are never shared between tokens.
+class ResponseCache:
+
+    def __init__(self, policies: Dict[str, CachePolicy]):
+        self._stores = {}
+        self._lock = threading.Lock()
+        self.policies = {}
+        for name, policy in policies.items():
+            if not isinstance(policy, CachePolicy):
+                raise DimoValueError(
+                    f"Cache policy for {name!r} must be a CachePolicy, but was {type(policy).__name__}"
+                )
+            self.policies[name] = policy
+
+    # Returns the store for a call, or None when no policy covers it
+    def store(self, service: str, endpoint: str) -> Optional[_EndpointCache]:
+        name = f"{service}:{endpoint}"
+        if name not in self.policies:
+            name = service
+            if name not in self.policies:
+                return None
+        store = self._stores.get(name)
+        if store is None:
+            with self._lock:
+                store = self._stores.setdefault(
+                    name, _EndpointCache(self.policies[name])
+                )
+        return store
+
+    @staticmethod
+    def key(method: str, url: str, headers: dict, params, data) -> str:
+        digest = hashlib.sha256()
+        digest.update(method.upper().encode())
+        digest.update(b"\0" + url.encode())
+        for name, value in sorted((params or {}).items()):
+            if value is not None:
+                digest.update(f"\0{name}={value}".encode())
+        if data is not None:
+            digest.update(
+                b"\0" + (data if isinstance(data, bytes) else str(data).encode())
+            )
+        digest.update(b"\0" + (headers or {}).get("Authorization", "").encode())
+        return digest.hexdigest()
+
+    # {policy name: {"hits", "misses", "revalidated", "evictions", "entries", "bytes"}}
+    def stats(self) -> dict:
+        return {name: store.stats() for name, store in list(self._stores.items())}
+
+    def clear(self) -> None:
+        for store in list(self._stores.values()):
+            store.clear()
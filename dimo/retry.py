@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional
+
+from dimo.errors import DimoError
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+
+class CircuitOpenError(DimoError):
+    def __init__(self, service: str, retry_in: float):
+        self.service = service
+        self.retry_in = retry_in
+        self.message = (
+            f"{service} is unavailable, failing fast for another {retry_in:.1f}s."
+        )
+        super().__init__(self.message)
+
+
+# Exponential backoff with full jitter. Only idempotent requests are retried, on the
+# given statuses or on connection errors, and a Retry-After header wins over backoff.
+class RetryPolicy:
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = (429, 502, 503, 504),
+        retry_methods: Iterable[str] = IDEMPOTENT_METHODS,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 120.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(method.upper() for method in retry_methods)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    # idempotent overrides the method check, e.g. for read-only GraphQL POSTs
+    def allows(self, method: str, idempotent: Optional[bool], attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in self.retry_methods
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff_factor * (2**attempt))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def retry_after(self, headers) -> Optional[float]:
+        if not self.respect_retry_after or headers is None:
+            return None
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0.0), self.max_retry_after)
+
+    def delay_for(self, attempt: int, headers=None) -> float:
+        retry_after = self.retry_after(headers)
+        return retry_after if retry_after is not None else self.backoff(attempt)
+
+
+# Per-service circuit breaker. After failure_threshold consecutive failures calls fail
+# fast with CircuitOpenError for recovery_timeout seconds, then one trial call is let
+# through (half-open) and its outcome closes or re-opens the circuit.
+class CircuitBreaker:
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self, service: str, failure_threshold: int = 5, recovery_timeout: float = 30.0
+    ):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            # A trial call that never reports back is retried after another timeout
+            if elapsed >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return
+            raise CircuitOpenError(
+                self.service, max(self.recovery_timeout - elapsed, 0.0)
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
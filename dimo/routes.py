@@ -0,0 +1,194 @@
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from dimo.errors import DimoValueError
+
+_PARAM = re.compile(r":([A-Za-z_]\w*)")
+
+
+# One REST endpoint. The path template is parsed once into a format string and
+# parameter names, so building a path is a single str.format call. Path params must be ints or
+# non-empty strings and are percent-escaped, so a value can never add path segments.
+# method, idempotent and cacheable tell the transport how the call may be retried
+# and cached.
+class Route:
+
+    __slots__ = (
+        "name",
+        "service",
+        "method",
+        "template",
+        "idempotent",
+        "cacheable",
+        "endpoint",
+        "_retry_override",
+        "params",
+        "_names",
+        "_format",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        service: Optional[str],
+        method: str,
+        template: str,
+        idempotent: Optional[bool] = None,
+        cacheable: Optional[bool] = None,
+    ):
+        if not template.startswith("/"):
+            raise DimoValueError(f"Route template must start with '/': {template!r}")
+        self.name = name
+        self.service = service
+        self.method = method.upper()
+        self.template = template
+        # Only a declared value overrides the retry policy's own method check
+        self._retry_override = idempotent
+        self.idempotent = (
+            idempotent if idempotent is not None else self.method in ("GET", "HEAD")
+        )
+        self.cacheable = cacheable if cacheable is not None else self.method == "GET"
+        # Same name hooks and the response cache use for the endpoint
+        self.endpoint = _PARAM.sub(":id", template)
+        pieces = _PARAM.split(template)
+        self.params = tuple(pieces[1::2])
+        self._names = frozenset(self.params)
+        literals = [
+            piece.replace("{", "{{").replace("}", "}}") for piece in pieces[::2]
+        ]
+        self._format = "{}".join(literals)
+
+    @staticmethod
+    def _escape(name: str, value) -> str:
+        if type(value) is int:
+            return str(value)
+        if isinstance(value, str) and value:
+            return quote(value, safe="")
+        raise DimoValueError(
+            f"Path param {name} must be an int or a non-empty str, but was {value!r}"
+        )
+
+    def path(self, **params) -> str:
+        if params.keys() != self._names:
+            raise DimoValueError(
+                f"{self.name} expects path params {', '.join(self.params) or 'none'}, got {', '.join(params) or 'none'}"
+            )
+        if not self.params:
+            return self.template
+        escape = self._escape
+        return self._format.format(
+            *[escape(name, params[name]) for name in self.params]
+        )
+
+    # Keyword arguments for DIMO.request, e.g. dimo.request(**route.bind(token_id=1))
+    def bind(self, **params) -> dict:
+        return {
+            "http_method": self.method,
+            "service": self.service,
+            "path": self.path(**params),
+            "idempotent": self._retry_override,
+            "endpoint": self.endpoint,
+            "cacheable": self.cacheable,
+        }
+
+    def __repr__(self) -> str:
+        return f"Route({self.name!r}, {self.method} {self.service}{self.template})"
+
+
+ROUTES: Dict[str, Route] = {}
+
+
+def register(route: Route) -> Route:
+    if route.name in ROUTES:
+        raise DimoValueError(f"Route {route.name!r} is already registered")
+    ROUTES[route.name] = route
+    return route
+
+
+def get_route(name: str) -> Route:
+    try:
+        return ROUTES[name]
+    except KeyError:
+        raise DimoValueError(f"Unknown route {name!r}") from None
+
+
+# Compiles ad-hoc templates such as the ones passed to DIMO._get_full_path
+@lru_cache(maxsize=256)
+def compile_template(template: str) -> Route:
+    if not template.startswith("/"):
+        template = f"/{template}"
+    return Route(template, None, "GET", template)
+
+
+# Attestation
+ATTESTATION_VIN_VC = register(
+    Route("attestation.create_vin_vc", "Attestation", "POST", "/v1/vc/vin/:token_id")
+)
+ATTESTATION_POM_VC = register(
+    Route("attestation.create_pom_vc", "Attestation", "POST", "/v1/vc/pom/:token_id")
+)
+
+# Auth
+AUTH_GENERATE_CHALLENGE = register(
+    Route("auth.generate_challenge", "Auth", "POST", "/auth/web3/generate_challenge")
+)
+AUTH_SUBMIT_CHALLENGE = register(
+    Route("auth.submit_challenge", "Auth", "POST", "/auth/web3/submit_challenge")
+)
+
+# Device Definitions. A VIN always decodes to the same definition, so the POST is safe
+# to retry and cache.
+DEVICE_DEFINITIONS_DECODE_VIN = register(
+    Route(
+        "device_definitions.decode_vin",
+        "DeviceDefinitions",
+        "POST",
+        "/device-definitions/decode-vin",
+        idempotent=True,
+        cacheable=True,
+    )
+)
+DEVICE_DEFINITIONS_SEARCH = register(
+    Route(
+        "device_definitions.search",
+        "DeviceDefinitions",
+        "GET",
+        "/device-definitions/search",
+    )
+)
+
+# Token Exchange
+TOKEN_EXCHANGE = register(
+    Route("token_exchange.exchange", "TokenExchange", "POST", "/v1/tokens/exchange")
+)
+
+# Trips
+TRIPS = register(Route("trips.trips", "Trips", "GET", "/v1/vehicle/:token_id/trips"))
+
+# Valuations
+VALUATIONS = register(
+    Route(
+        "valuations.get_valuations",
+        "Valuations",
+        "GET",
+        "/v2/vehicles/:token_id/valuations",
+    )
+)
+VALUATIONS_INSTANT_OFFER = register(
+    Route(
+        "valuations.offers_lookup",
+        "Valuations",
+        "GET",
+        "/v2/vehicles/:token_id/instant-offer",
+    )
+)
+VALUATIONS_OFFERS = register(
+    Route(
+        "valuations.list_vehicle_offers",
+        "Valuations",
+        "GET",
+        "/v2/vehicles/:token_id/offers",
+    )
+)
@@ -0,0 +1,85 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple, Union
+
+from dimo.errors import DimoValueError
+
+TimeLike = Union[str, datetime]
+DurationLike = Union[str, timedelta]
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s|d)")
+_DURATION_UNITS = {
+    "ms": timedelta(milliseconds=1),
+    "s": timedelta(seconds=1),
+    "m": timedelta(minutes=1),
+    "h": timedelta(hours=1),
+    "d": timedelta(days=1),
+}
+_FRACTION = re.compile(r"^(.*?)\.(\d+)(.*)$")
+
+
+# Parses Telemetry interval strings such as "24h", "1h30m" or "500ms"
+def parse_duration(value: DurationLike) -> timedelta:
+    if isinstance(value, timedelta):
+        duration = value
+    else:
+        parts = _DURATION_PART.findall(value or "")
+        if not parts or "".join(n + u for n, u in parts) != value:
+            raise DimoValueError(f"Invalid duration: {value!r}")
+        duration = sum(
+            (float(number) * _DURATION_UNITS[unit] for number, unit in parts),
+            timedelta(),
+        )
+    if duration <= timedelta():
+        raise DimoValueError(f"Duration must be positive, got {value!r}")
+    return duration
+
+
+# Parses RFC 3339 timestamps (or dates) into timezone-aware UTC datetimes
+def parse_time(value: TimeLike) -> datetime:
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = value.strip().replace("Z", "+00:00").replace("z", "+00:00")
+        # Before Python 3.11 fromisoformat only takes 3 or 6 fraction digits, while
+        # RFC 3339 producers such as Go trim trailing zeros or send nanoseconds
+        match = _FRACTION.match(text)
+        if match:
+            head, fraction, tail = match.groups()
+            text = f"{head}.{fraction[:6].ljust(6, '0')}{tail}"
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            raise DimoValueError(f"Invalid timestamp: {value!r}")
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def format_time(value: datetime) -> str:
+    timespec = "microseconds" if value.microsecond else "seconds"
+    return (
+        value.astimezone(timezone.utc)
+        .isoformat(timespec=timespec)
+        .replace("+00:00", "Z")
+    )
+
+
+# Splits [start, end) into consecutive windows of at most `window`. Window sizes are
+# rounded up to a whole number of intervals and every boundary falls on
+# start + k * interval, so aggregation buckets never straddle two windows.
+def plan_windows(
+    start: TimeLike, end: TimeLike, interval: DurationLike, window: DurationLike
+) -> List[Tuple[datetime, datetime]]:
+    start, end = parse_time(start), parse_time(end)
+    interval, window = parse_duration(interval), parse_duration(window)
+    if end <= start:
+        return []
+    step = interval * max(1, -(-window // interval))
+    windows = []
+    window_start = start
+    while window_start < end:
+        window_end = min(window_start + step, end)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
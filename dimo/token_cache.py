@@ -0,0 +1,126 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+# Reads the exp claim from a JWT without verifying it. Returns None when missing.
+def get_jwt_expiry(token: str) -> Optional[float]:
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        exp = claims.get("exp")
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+# Lock handed out by VehicleJWTCache.key_lock(), usable with "with" or "async with"
+# depending on the lock factory. The cache drops it once no caller holds or waits for
+# it, so keys whose exchange failed or was never cached do not keep a lock around.
+class _KeyLock:
+
+    __slots__ = ("_cache", "_key", "lock", "users")
+
+    def __init__(self, cache, key, lock):
+        self._cache = cache
+        self._key = key
+        self.lock = lock
+        self.users = 0
+
+    def __enter__(self):
+        try:
+            self.lock.acquire()
+        except BaseException:
+            self._cache._release_key_lock(self._key)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.lock.release()
+        self._cache._release_key_lock(self._key)
+
+    async def __aenter__(self):
+        try:
+            await self.lock.acquire()
+        except BaseException:
+            self._cache._release_key_lock(self._key)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.lock.release()
+        self._cache._release_key_lock(self._key)
+
+
+# Bounded LRU cache of token exchange responses. Entries go stale refresh_margin
+# seconds before the JWT exp claim, and key_lock() hands out one lock per key so
+# only one caller refreshes a given vehicle at a time. get() returns a copy, so
+# callers cannot change the cached response.
+class VehicleJWTCache:
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        refresh_margin: float = 60.0,
+        lock_factory=threading.Lock,
+    ):
+        self.max_size = max_size
+        self.refresh_margin = refresh_margin
+        self._lock_factory = lock_factory
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            response, expires_at = entry
+            if time.time() >= expires_at - self.refresh_margin:
+                return None
+            self._entries.move_to_end(key)
+            return dict(response)
+
+    def put(self, key: Hashable, response: dict) -> None:
+        token = response.get("token") if isinstance(response, dict) else None
+        expires_at = get_jwt_expiry(token) if isinstance(token, str) else None
+        if expires_at is None:
+            return
+        with self._lock:
+            self._entries[key] = (dict(response), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # Must be entered right away, the lock is counted as in use until it is released
+    def key_lock(self, key: Hashable) -> _KeyLock:
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock(
+                    self, key, self._lock_factory()
+                )
+            key_lock.users += 1
+            return key_lock
+
+    def _release_key_lock(self, key: Hashable) -> None:
+        with self._lock:
+            key_lock = self._key_locks[key]
+            key_lock.users -= 1
+            if key_lock.users == 0:
+                del self._key_locks[key]
+
+    def invalidate(self, key: Hashable = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,435 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .errors import DimoError, DimoValueError
+
+
+# What a transport was asked to send, as seen by MemoryTransport handlers
+class TransportRequest(NamedTuple):
+    method: str
+    url: str
+    headers: dict
+    params: Optional[dict]
+    data: Optional[bytes]
+
+
+# The part of requests.Response that Request reads: status_code, headers, content,
+# elapsed and raise_for_status(). Returned by the transports that do not wrap requests
+# or httpx.
+class TransportResponse:
+
+    def __init__(
+        self,
+        status_code: int = 200,
+        content: bytes = b"",
+        headers: dict = None,
+        url: str = None,
+        elapsed: float = 0.0,
+    ):
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.url = url
+        self.elapsed = timedelta(seconds=elapsed)
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    # Raises the same exception type as the default requests transport
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.HTTPError(
+                f"{self.status_code} {kind} Error for url: {self.url}", response=self
+            )
+
+    def __repr__(self) -> str:
+        return f"<TransportResponse [{self.status_code}]>"
+
+
+# Sends one HTTP request for a DIMO client. DIMO(transport=...) accepts any object with
+# request(method, url, headers=None, params=None, data=None, **kwargs) returning a
+# response like TransportResponse, and close(). Exceptions listed in transport_errors
+# count as network failures, which the retry policy and circuit breakers act on.
+# Subclasses must implement request().
+class Transport(ABC):
+
+    transport_errors = ()
+
+    @abstractmethod
+    def request(self, method, url, headers=None, params=None, data=None, **kwargs):
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# The default backend, a pooled requests.Session
+class RequestsTransport(Transport):
+
+    transport_errors = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, session: requests.Session = None):
+        self.session = session if session is not None else requests.Session()
+
+    def request(self, method, url, headers=None, params=None, data=None, **kwargs):
+        return self.session.request(
+            method=method, url=url, headers=headers, params=params, data=data, **kwargs
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+# Sends requests through an httpx.Client, which also speaks HTTP/2
+class HTTPXTransport(Transport):
+
+    def __init__(self, client=None, **client_kwargs):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "HTTPXTransport requires httpx. Install it with: pip install 'dimo-python-sdk[async]'"
+            ) from e
+
+        self.client = client if client is not None else httpx.Client(**client_kwargs)
+        self.transport_errors = (httpx.TransportError,)
+
+    def request(self, method, url, headers=None, params=None, data=None, **kwargs):
+        # httpx sends None-valued params as empty strings, requests drops them
+        if params:
+            params = {key: value for key, value in params.items() if value is not None}
+        return self.client.request(
+            method=method,
+            url=url,
+            headers=headers,
+            params=params,
+            content=data,
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def _encode_body(data) -> Optional[bytes]:
+    if data is None or isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode()
+    if isinstance(data, (dict, list)):
+        return json.dumps(data).encode()
+    raise DimoValueError(f"Cannot send a request body of type {type(data).__name__}")
+
+
+def _with_params(url: str, params: Optional[dict]) -> str:
+    if not params:
+        return url
+    query = urlencode(
+        [(key, value) for key, value in params.items() if value is not None],
+        doseq=True,
+    )
+    if not query:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{query}"
+
+
+# Talks to urllib3 directly, skipping the per-request work requests adds on top of it.
+# timeout is a number or a (connect, read) tuple, like for DIMO.
+class Urllib3Transport(Transport):
+
+    def __init__(self, pool_maxsize: int = 10, pool_block: bool = False, timeout=None):
+        import urllib3
+
+        self._urllib3 = urllib3
+        self.pool = urllib3.PoolManager(maxsize=pool_maxsize, block=pool_block)
+        self.timeout = timeout
+        self.transport_errors = (urllib3.exceptions.HTTPError,)
+
+    def _timeout(self, timeout):
+        if isinstance(timeout, tuple):
+            return self._urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        return self._urllib3.Timeout(total=timeout)
+
+    def request(
+        self, method, url, headers=None, params=None, data=None, timeout=None
+    ) -> TransportResponse:
+        url = _with_params(url, params)
+        started = time.perf_counter()
+        response = self.pool.request(
+            method,
+            url,
+            body=_encode_body(data),
+            headers=headers,
+            timeout=self._timeout(timeout if timeout is not None else self.timeout),
+            retries=False,
+            redirect=True,
+        )
+        return TransportResponse(
+            response.status,
+            response.data,
+            dict(response.headers),
+            url,
+            time.perf_counter() - started,
+        )
+
+    def close(self) -> None:
+        self.pool.clear()
+
+
+def _response_from(result, url: str) -> TransportResponse:
+    if isinstance(result, TransportResponse):
+        return result
+    return TransportResponse(200, _encode_body(result) or b"", None, url)
+
+
+# Answers requests from registered routes without touching the network, for tests and
+# for measuring the SDK's own overhead. Requests are kept in self.calls. An unmatched
+# request gets a 404.
+class MemoryTransport(Transport):
+
+    def __init__(self):
+        self._routes = []
+        self.calls = []
+
+    # url is a full URL (without query string) or a compiled regex searched against it.
+    # body may be a dict or list (sent as JSON), str or bytes. handler, if given, is
+    # called with the TransportRequest and returns a TransportResponse or a body.
+    # The most recently added matching route wins.
+    def add(
+        self,
+        method: str,
+        url: Union[str, "re.Pattern"],
+        body=None,
+        status: int = 200,
+        headers: dict = None,
+        handler: Callable = None,
+    ) -> "MemoryTransport":
+        if handler is None:
+            content = _encode_body(body) or b""
+            response_headers = {"Content-Type": "application/json", **(headers or {})}
+
+            def handler(request):
+                return TransportResponse(status, content, response_headers, request.url)
+
+        self._routes.append((method.upper(), url, handler))
+        return self
+
+    def _match(self, method: str, url: str):
+        for route_method, pattern, handler in reversed(self._routes):
+            if route_method != method:
+                continue
+            if isinstance(pattern, str):
+                if pattern == url:
+                    return handler
+            elif pattern.search(url):
+                return handler
+        return None
+
+    def request(
+        self, method, url, headers=None, params=None, data=None, **kwargs
+    ) -> TransportResponse:
+        method = method.upper()
+        request = TransportRequest(
+            method, url, dict(headers or {}), params, _encode_body(data)
+        )
+        self.calls.append(request)
+        handler = self._match(method, url.split("?", 1)[0])
+        if handler is None:
+            message = {"message": f"No MemoryTransport route for {method} {url}"}
+            return TransportResponse(404, json.dumps(message).encode(), None, url)
+        return _response_from(handler(request), url)
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+
+# Bodies are kept decoded, so the headers describing how they were sent on the wire
+# no longer apply and would make httpx decode them a second time
+_WIRE_HEADERS = frozenset(("content-encoding", "content-length", "transfer-encoding"))
+
+
+def _replayable_headers(headers) -> dict:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in _WIRE_HEADERS
+    }
+
+
+# Identifies a request for replay: method, URL, query params in sorted order and a
+# digest of the body. Headers are left out, so tokens never decide a match.
+def _request_key(method, url, params, data, match_body=True) -> str:
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [
+            (key, str(value)) for key, value in params.items() if value is not None
+        ]
+    body = hashlib.sha256(data or b"").hexdigest() if match_body else ""
+    base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+    return f"{method.upper()} {base}?{urlencode(sorted(query))} {body}"
+
+
+# Records responses from a real transport to a JSON lines file (mode="record") and
+# serves them back without a network (mode="replay"). Responses recorded for the same
+# request are replayed in order, and the last one keeps repeating, so a short recording
+# can drive a long load test. simulate_latency=True waits the recorded response time.
+# Request headers are never written, but response bodies are, including any tokens
+# they contain.
+class RecordingTransport(Transport):
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        transport: Transport = None,
+        match_body: bool = True,
+        simulate_latency: bool = False,
+    ):
+        if mode not in ("record", "replay"):
+            raise DimoValueError(f"mode must be 'record' or 'replay', got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.match_body = match_body
+        self.simulate_latency = simulate_latency
+        self._lock = threading.Lock()
+        if mode == "record":
+            self.transport = transport if transport is not None else RequestsTransport()
+            self.transport_errors = getattr(self.transport, "transport_errors", ())
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self.transport = None
+            self._file = None
+            self._recorded = self._load(path)
+            self._positions = {}
+
+    @staticmethod
+    def _load(path: str) -> dict:
+        recorded = {}
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    entry = json.loads(line)
+                    recorded.setdefault(entry["key"], []).append(entry)
+        return recorded
+
+    def request(self, method, url, headers=None, params=None, data=None, **kwargs):
+        data = _encode_body(data)
+        key = _request_key(method, url, params, data, self.match_body)
+        if self.mode == "record":
+            return self._record(key, method, url, headers, params, data, kwargs)
+        return self._replay(key, method, url)
+
+    def _record(self, key, method, url, headers, params, data, kwargs):
+        response = self.transport.request(
+            method, url, headers=headers, params=params, data=data, **kwargs
+        )
+        content = response.content
+        try:
+            body = {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"base64": base64.b64encode(content).decode("ascii")}
+        elapsed = getattr(response, "elapsed", None)
+        entry = {
+            "key": key,
+            "method": method.upper(),
+            "url": url,
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in _replayable_headers(response.headers).items()
+                if name.lower() != "set-cookie"
+            },
+            "elapsed": elapsed.total_seconds() if elapsed is not None else 0.0,
+            **body,
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+        return response
+
+    def _replay(self, key, method, url) -> TransportResponse:
+        entries = self._recorded.get(key)
+        if not entries:
+            raise DimoError(f"No recorded response for {method.upper()} {url}")
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+        entry = entries[min(position, len(entries) - 1)]
+        if self.simulate_latency and entry["elapsed"]:
+            time.sleep(entry["elapsed"])
+        if "base64" in entry:
+            content = base64.b64decode(entry["base64"])
+        else:
+            content = entry["text"].encode("utf-8")
+        return TransportResponse(
+            entry["status"], content, entry["headers"], url, entry["elapsed"]
+        )
+
+    # Starts every replayed request over from its first recorded response
+    def rewind(self) -> None:
+        with self._lock:
+            self._positions.clear()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.transport is not None:
+            self.transport.close()
+
+
+# Wraps a Transport as an httpx async transport, so AsyncDIMO can use MemoryTransport
+# and RecordingTransport replays. The wrapped transport is called on the event loop,
+# which suits in-memory backends but not ones that block on the network.
+def async_transport(transport: Transport):
+    import httpx
+
+    class _AsyncTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            response = transport.request(
+                request.method,
+                str(request.url),
+                headers=dict(request.headers),
+                data=await request.aread(),
+            )
+            result = httpx.Response(
+                response.status_code,
+                headers=_replayable_headers(response.headers),
+                content=response.content,
+                request=request,
+            )
+            result.elapsed = getattr(response, "elapsed", None) or timedelta(0)
+            return result
+
+        async def aclose(self):
+            transport.close()
+
+    return _AsyncTransport()
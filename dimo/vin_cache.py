@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "dimo", "vin_decodes.sqlite3"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vin_decodes (
+    country_code TEXT NOT NULL,
+    vin TEXT NOT NULL,
+    response TEXT NOT NULL,
+    decoded_at REAL NOT NULL,
+    PRIMARY KEY (country_code, vin)
+)
+"""
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 400
+
+
+def normalize_vin(vin: str) -> str:
+    return vin.strip().upper()
+
+
+# Persistent decode_vin results keyed by (country_code, VIN), stored in a SQLite file.
+# A VIN always decodes to the same definition, so entries never expire. The file runs
+# in WAL mode and can be shared by every process and thread on the host.
+class VINCache:
+
+    def __init__(self, path: str = DEFAULT_PATH, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(_SCHEMA)
+        connection.commit()
+
+    # sqlite3 connections cannot be shared between threads, so each thread opens its own
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def get(self, country_code: str, vin: str) -> Optional[dict]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT response FROM vin_decodes WHERE country_code = ? AND vin = ?",
+                (country_code, normalize_vin(vin)),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    # Returns {vin: response} for the VINs found, keyed by normalized VIN
+    def get_many(self, country_code: str, vins: Iterable[str]) -> Dict[str, dict]:
+        vins = list(dict.fromkeys(normalize_vin(vin) for vin in vins))
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(vins), _LOOKUP_CHUNK):
+            chunk = vins[start : start + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT vin, response FROM vin_decodes WHERE country_code = ? AND vin IN ({placeholders})",
+                (country_code, *chunk),
+            )
+            for vin, response in rows:
+                found[vin] = json.loads(response)
+        return found
+
+    def put(self, country_code: str, vin: str, response: dict) -> None:
+        self.put_many(country_code, [(vin, response)])
+
+    def put_many(
+        self, country_code: str, responses: Iterable[Tuple[str, dict]]
+    ) -> None:
+        now = time.time()
+        rows = [
+            (country_code, normalize_vin(vin), json.dumps(response), now)
+            for vin, response in responses
+            if response is not None
+        ]
+        if not rows:
+            return
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO vin_decodes (country_code, vin, response, decoded_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def invalidate(self, country_code: str, vin: str) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM vin_decodes WHERE country_code = ? AND vin = ?",
+                (country_code, normalize_vin(vin)),
+            )
+
+    def clear(self) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM vin_decodes")
+
+    def __len__(self) -> int:
+        return (
+            self._connection().execute("SELECT COUNT(*) FROM vin_decodes").fetchone()[0]
+        )
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
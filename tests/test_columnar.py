@@ -0,0 +1,48 @@
+import re
+
+import pytest
+
+from dimo import DIMO, MemoryTransport
+from dimo.errors import DimoValueError
+
+np = pytest.importorskip("numpy")
+
+ROWS = [
+    {"timestamp": "2024-01-01T00:00:00Z", "speed": 10.5, "odometer": 100},
+    {"timestamp": "2024-01-01T01:00:00Z", "speed": None, "odometer": 101},
+]
+
+
+def telemetry(body):
+    transport = MemoryTransport().add("POST", re.compile(r"/query$"), body)
+    return DIMO(transport=transport).telemetry
+
+
+def test_query_returns_columns():
+    columns = telemetry({"data": {"signals": ROWS}}).query(
+        "query", "vehicle-jwt", output="columns"
+    )
+    assert columns["timestamp"].dtype == np.dtype("datetime64[ms]")
+    assert columns["odometer"].tolist() == [100, 101]
+    assert np.isnan(columns["speed"][1])
+
+
+def test_query_builds_only_requested_columns():
+    columns = telemetry({"data": {"signals": ROWS}}).query(
+        "query", "vehicle-jwt", output="columns", columns=["timestamp", "speed"]
+    )
+    assert set(columns) == {"timestamp", "speed"}
+
+
+def test_query_rejects_unknown_field():
+    with pytest.raises(DimoValueError, match="'signal'"):
+        telemetry({"data": {"signals": ROWS}}).query(
+            "query", "vehicle-jwt", output="columns", field="signal"
+        )
+
+
+def test_query_with_null_field_returns_empty_columns():
+    columns = telemetry({"data": {"signals": None}}).query(
+        "query", "vehicle-jwt", output="columns", columns=["timestamp"]
+    )
+    assert len(columns["timestamp"]) == 0
@@ -0,0 +1,53 @@
+import asyncio
+import re
+
+import pytest
+
+from dimo import DIMO, AsyncDIMO, MemoryTransport
+from dimo.definition_index import DeviceDefinitionIndex
+
+SEARCH = re.compile(r"/device-definitions/search$")
+DEFINITIONS = [
+    {"id": "lexus_gx_2023", "make": {"name": "Lexus"}, "model": "GX", "year": 2023},
+    {"id": "lexus_rx_2021", "make": {"name": "Lexus"}, "model": "RX", "year": 2021},
+]
+
+
+def search_transport():
+    return MemoryTransport().add(
+        "GET",
+        SEARCH,
+        {"deviceDefinitions": DEFINITIONS, "pagination": {"totalPages": 1}},
+    )
+
+
+def test_sync_index_then_search_locally():
+    transport = search_transport()
+    dimo = DIMO(transport=transport)
+    assert dimo.device_definitions.sync_index() == 2
+    found = dimo.device_definitions.search_device_definitions(query="lex", year=2021)
+    assert [item["id"] for item in found["deviceDefinitions"]] == ["lexus_rx_2021"]
+    assert len(transport.calls) == 1
+
+
+def test_cold_index_searches_remotely():
+    transport = search_transport()
+    dimo = DIMO(transport=transport, definition_index=DeviceDefinitionIndex())
+    dimo.device_definitions.search_device_definitions(query="lex")
+    assert len(transport.calls) == 1
+
+
+def test_async_sync_index_then_search_locally():
+    pytest.importorskip("httpx")
+    transport = search_transport()
+
+    async def main():
+        async with AsyncDIMO(transport=transport) as dimo:
+            synced = await dimo.device_definitions.sync_index()
+            found = await dimo.device_definitions.search_device_definitions(query="lex")
+            return synced, found
+
+    synced, found = asyncio.run(main())
+    assert synced == 2
+    assert found["pagination"]["totalItems"] == 2
+    assert len(transport.calls) == 1
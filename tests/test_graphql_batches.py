@@ -0,0 +1,209 @@
+import asyncio
+
+import pytest
+
+from dimo import DIMO, AsyncDIMO, MemoryTransport
+from dimo.errors import DimoError, DimoTypeError
+
+CLIENT_ID = "0xabc"
+
+
+def sacds(permissions="0x3c", grantee=CLIENT_ID):
+    return {"sacds": {"nodes": [{"grantee": grantee, "permissions": permissions}]}}
+
+
+def client(handler, service="Identity"):
+    transport = MemoryTransport()
+    dimo = DIMO(transport=transport)
+    transport.add("POST", dimo.urls[service], handler=handler)
+    return dimo, transport
+
+
+def test_check_vehicles_privileges_maps_aliased_vehicles():
+    dimo, _ = client(lambda request: {"data": {"v0": sacds(), "v1": None}})
+    vehicles = dimo.identity.check_vehicles_privileges([5, 6])
+    assert vehicles == {5: sacds(), 6: None}
+    assert vehicles.errors == {}
+
+
+def test_check_vehicles_privileges_raises_when_batch_fails():
+    dimo, _ = client(
+        lambda request: {"data": None, "errors": [{"message": "upstream timeout"}]}
+    )
+    with pytest.raises(DimoError, match="upstream timeout"):
+        dimo.identity.check_vehicles_privileges([5, 6])
+
+
+def test_check_vehicles_privileges_maps_path_errors_to_vehicles():
+    dimo, _ = client(
+        lambda request: {
+            "data": {"v0": sacds(), "v1": None},
+            "errors": [{"message": "rate limited", "path": ["v1", "sacds"]}],
+        }
+    )
+    vehicles = dimo.identity.check_vehicles_privileges([5, 6])
+    assert vehicles == {5: sacds()}
+    assert "rate limited" in str(vehicles.errors[6])
+
+
+def test_exchange_many_reports_identity_failures_not_missing_shares():
+    def identity(request):
+        return {"data": None, "errors": [{"message": "upstream timeout"}]}
+
+    dimo, transport = client(identity)
+    results = list(
+        dimo.token_exchange.exchange_many(
+            "developer-jwt", [1, 2], client_id=CLIENT_ID, use_cache=False
+        )
+    )
+    assert len(results) == 2
+    for result in results:
+        assert isinstance(result.error, DimoError)
+        assert "upstream timeout" in str(result.error)
+        assert "shared" not in str(result.error)
+    assert all("tokens/exchange" not in call.url for call in transport.calls)
+
+
+def test_exchange_many_fails_only_the_vehicle_with_a_path_error():
+    def identity(request):
+        return {
+            "data": {"v0": sacds(), "v1": None},
+            "errors": [{"message": "bad alias", "path": ["v1"]}],
+        }
+
+    dimo, transport = client(identity)
+    transport.add(
+        "POST",
+        dimo.urls["TokenExchange"] + "/v1/tokens/exchange",
+        {"token": "vehicle-jwt"},
+    )
+    results = {
+        result.token_id: result
+        for result in dimo.token_exchange.exchange_many(
+            "developer-jwt", [1, 2], client_id=CLIENT_ID, use_cache=False
+        )
+    }
+    assert results[1].response == {"token": "vehicle-jwt"}
+    assert "bad alias" in str(results[2].error)
+
+
+def test_signals_latest_many_records_batch_failures():
+    dimo, _ = client(
+        lambda request: {"data": None, "errors": [{"message": "upstream timeout"}]},
+        service="Telemetry",
+    )
+    results = dimo.telemetry.get_signals_latest_many([("jwt", 1), ("jwt", 2)])
+    assert dict(results) == {}
+    assert set(results.errors) == {1, 2}
+    assert "upstream timeout" in str(results.errors[1])
+    assert "upstream timeout" in str(results.timings[0].error)
+
+
+def test_signals_latest_many_records_path_errors_per_vehicle():
+    dimo, _ = client(
+        lambda request: {
+            "data": {"v0": {"speed": {"value": 10}}, "v1": None},
+            "errors": [{"message": "no access", "path": ["v1", "speed"]}],
+        },
+        service="Telemetry",
+    )
+    results = dimo.telemetry.get_signals_latest_many([("jwt", 1), ("jwt", 2)])
+    assert results == {1: {"speed": {"value": 10}}}
+    assert "no access" in str(results.errors[2])
+    assert results.timings[0].error is None
+
+
+@pytest.mark.parametrize("privileges", [None, [1]])
+def test_exchange_many_validates_token_ids_before_sending(privileges):
+    dimo, transport = client(lambda request: {"data": {"v0": sacds()}})
+    results = dimo.token_exchange.exchange_many(
+        "developer-jwt",
+        [1, "2", 3],
+        client_id=CLIENT_ID,
+        privileges=privileges,
+        use_cache=False,
+    )
+    with pytest.raises(DimoTypeError, match="token_id"):
+        next(results)
+    assert transport.calls == []
+
+
+def async_client(handler, service="Identity"):
+    pytest.importorskip("httpx")
+    transport = MemoryTransport()
+    dimo = AsyncDIMO(transport=transport)
+    transport.add("POST", dimo.urls[service], handler=handler)
+    return dimo
+
+
+def test_async_check_vehicles_privileges_maps_path_errors_to_vehicles():
+    dimo = async_client(
+        lambda request: {
+            "data": {"v0": sacds(), "v1": None},
+            "errors": [{"message": "rate limited", "path": ["v1", "sacds"]}],
+        }
+    )
+
+    async def main():
+        async with dimo:
+            return await dimo.identity.check_vehicles_privileges([5, 6])
+
+    vehicles = asyncio.run(main())
+    assert vehicles == {5: sacds()}
+    assert "rate limited" in str(vehicles.errors[6])
+
+
+def test_async_check_vehicles_privileges_raises_when_batch_fails():
+    dimo = async_client(
+        lambda request: {"data": None, "errors": [{"message": "upstream timeout"}]}
+    )
+
+    async def main():
+        async with dimo:
+            await dimo.identity.check_vehicles_privileges([5, 6])
+
+    with pytest.raises(DimoError, match="upstream timeout"):
+        asyncio.run(main())
+
+
+def test_async_signals_latest_many_records_batch_failures():
+    dimo = async_client(
+        lambda request: {"data": None, "errors": [{"message": "upstream timeout"}]},
+        service="Telemetry",
+    )
+
+    async def main():
+        async with dimo:
+            return await dimo.telemetry.get_signals_latest_many(
+                [("jwt", 1), ("jwt", 2)]
+            )
+
+    results = asyncio.run(main())
+    assert dict(results) == {}
+    assert set(results.errors) == {1, 2}
+    assert "upstream timeout" in str(results.timings[0].error)
+
+
+@pytest.mark.parametrize("path", [None, ["vehicles"], []])
+def test_unattributed_errors_fail_every_vehicle_in_the_batch(path):
+    error = {"message": "rate limited"}
+    if path is not None:
+        error["path"] = path
+    dimo, _ = client(
+        lambda request: {"data": {"v0": None, "v1": sacds()}, "errors": [error]}
+    )
+    vehicles = dimo.identity.check_vehicles_privileges([5, 6])
+    assert vehicles == {}
+    assert set(vehicles.errors) == {5, 6}
+    assert "rate limited" in str(vehicles.errors[5])
+
+
+def test_exchange_many_reports_unattributed_errors_not_missing_shares():
+    dimo, transport = client(
+        lambda request: {"data": {"v0": None}, "errors": [{"message": "rate limited"}]}
+    )
+    (result,) = dimo.token_exchange.exchange_many(
+        "developer-jwt", [1], client_id=CLIENT_ID, use_cache=False
+    )
+    assert "rate limited" in str(result.error)
+    assert "shared" not in str(result.error)
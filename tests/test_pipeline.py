@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from dimo import AsyncFleetPipeline, FleetPipeline
+from dimo.errors import DimoTypeError, DimoValueError
+
+
+def pipeline(calls):
+    def record(vehicle):
+        calls.append(vehicle.token_id)
+        return vehicle.token_id * 10
+
+    return FleetPipeline(None).add_stage("double", record)
+
+
+def test_run_yields_a_result_per_vehicle():
+    calls = []
+    run = pipeline(calls).run([(1, "jwt"), 2])
+    results = {result.token_id: result for result in run}
+    assert results[1].results == {"double": 10}
+    assert results[2].error is None
+    progress = run.progress()
+    assert (progress.started, progress.completed, progress.failed) == (2, 2, 0)
+    assert progress.stages["double"].completed == 2
+
+
+def test_failing_stage_ends_only_that_vehicle():
+    def stage(vehicle):
+        if vehicle.token_id == 2:
+            raise RuntimeError("boom")
+        return "ok"
+
+    run = FleetPipeline(None).add_stage("check", stage).run([1, 2, 3])
+    failed = [result for result in run if result.error is not None]
+    assert [(result.token_id, result.failed_stage) for result in failed] == [
+        (2, "check")
+    ]
+    assert run.progress().failed == 1
+
+
+@pytest.mark.parametrize(
+    "bad, error", [("bad", DimoTypeError), ((2, "jwt", 3), DimoValueError)]
+)
+def test_invalid_vehicles_raise_before_any_stage_runs(bad, error):
+    calls = []
+    with pytest.raises(error):
+        pipeline(calls).run([(1, "jwt"), bad, (2, "jwt")])
+    assert calls == []
+
+
+def test_overlapping_runs_keep_their_own_progress():
+    release = threading.Event()
+
+    def stage(vehicle):
+        release.wait(5)
+        return vehicle.token_id
+
+    fleet = FleetPipeline(None).add_stage("wait", stage, max_workers=4)
+    first = fleet.run([1, 2])
+    second = fleet.run([3, 4, 5])
+    worker = threading.Thread(target=lambda: list(first))
+    worker.start()
+    release.set()
+    list(second)
+    worker.join()
+    assert first.progress().completed == 2
+    assert second.progress().completed == 3
+    assert fleet.progress().completed == 3
+
+
+def test_async_pipeline_validates_and_keeps_progress():
+    async def stage(vehicle):
+        await asyncio.sleep(0)
+        return vehicle.token_id
+
+    fleet = AsyncFleetPipeline(None).add_stage("sleep", stage)
+    with pytest.raises(DimoTypeError):
+        fleet.run([1, "bad"])
+
+    async def main():
+        run = fleet.run([1, 2, 3])
+        results = [result async for result in run]
+        return results, run.progress()
+
+    results, progress = asyncio.run(main())
+    assert sorted(result.token_id for result in results) == [1, 2, 3]
+    assert progress.completed == 3
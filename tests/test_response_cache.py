@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from dimo import DIMO, AsyncDIMO, MemoryTransport
+from dimo.instrumentation import LatencyHistogram
+from dimo.response_cache import CachePolicy, ResponseCache
+
+QUERY = "query GetVehicle { vehicle(tokenId: 1) { id } }"
+
+
+@pytest.fixture
+def identity():
+    transport = MemoryTransport()
+    cache = ResponseCache({"Identity": CachePolicy(ttl=60)})
+    dimo = DIMO(transport=transport, cache=cache)
+    responses = []
+    transport.add("POST", dimo.urls["Identity"], handler=lambda r: responses.pop(0))
+    return dimo, transport, cache, responses
+
+
+def test_successful_query_is_served_from_cache(identity):
+    dimo, transport, cache, responses = identity
+    responses.append({"data": {"vehicle": {"id": 1}}})
+    assert dimo.query("Identity", QUERY) == {"data": {"vehicle": {"id": 1}}}
+    assert dimo.query("Identity", QUERY) == {"data": {"vehicle": {"id": 1}}}
+    assert len(transport.calls) == 1
+    assert cache.stats()["Identity"]["hits"] == 1
+
+
+def test_graphql_errors_are_not_cached(identity):
+    dimo, transport, cache, responses = identity
+    responses.append({"data": None, "errors": [{"message": "upstream timeout"}]})
+    responses.append({"data": {"vehicle": {"id": 1}}})
+    assert dimo.query("Identity", QUERY)["errors"]
+    assert dimo.query("Identity", QUERY) == {"data": {"vehicle": {"id": 1}}}
+    assert len(transport.calls) == 2
+    assert cache.stats()["Identity"]["hits"] == 0
+
+
+def test_graphql_errors_are_not_cached_in_raw_mode(identity):
+    dimo, transport, _, responses = identity
+    responses.append({"data": None, "errors": [{"message": "upstream timeout"}]})
+    responses.append({"data": {"vehicle": {"id": 1}}})
+    assert b"upstream timeout" in dimo.query("Identity", QUERY, raw=True)
+    assert b'"id"' in dimo.query("Identity", QUERY, raw=True)
+    assert len(transport.calls) == 2
+
+
+def test_cache_entries_are_scoped_to_the_token(identity):
+    dimo, transport, _, responses = identity
+    responses.extend([{"data": {"vehicle": {"id": 1}}}] * 2)
+    dimo.query("Identity", QUERY, token="first")
+    dimo.query("Identity", QUERY, token="second")
+    assert len(transport.calls) == 2
+
+
+def test_cache_hits_are_reported_to_hooks(identity):
+    dimo, _, _, responses = identity
+    events, histogram = [], LatencyHistogram()
+    dimo.add_hook(events.append)
+    dimo.add_hook(histogram)
+    responses.append({"data": {"vehicle": {"id": 1}}})
+    for _ in range(3):
+        dimo.query("Identity", QUERY)
+    assert [(event.status, event.cached) for event in events] == [
+        (200, False),
+        (None, True),
+        (None, True),
+    ]
+    assert events[1].endpoint == "GetVehicle"
+    assert events[1].response_bytes > 0
+    assert histogram.percentiles()["Identity"]["count"] == 3
+    assert 'cache_hits_total{service="Identity"' in histogram.to_prometheus()
+
+
+def test_async_cache_hits_are_reported_to_hooks():
+    pytest.importorskip("httpx")
+    events = []
+    transport = MemoryTransport()
+    cache = ResponseCache({"Identity": CachePolicy(ttl=60)})
+
+    async def main():
+        async with AsyncDIMO(
+            transport=transport, cache=cache, hooks=[events.append]
+        ) as dimo:
+            transport.add("POST", dimo.urls["Identity"], {"data": {"vehicle": None}})
+            for _ in range(2):
+                await dimo.query("Identity", QUERY)
+
+    asyncio.run(main())
+    assert [event.cached for event in events] == [False, True]
+    assert len(transport.calls) == 1
@@ -0,0 +1,179 @@
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from dimo import DIMO, MemoryTransport, TransportResponse
+from dimo.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+VALUATIONS = re.compile(r"/v2/vehicles/7/valuations$")
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock.monotonic)
+    return clock
+
+
+def responses(*statuses, headers=None):
+    statuses = list(statuses)
+
+    def handler(request):
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        return TransportResponse(status, b'{"price": 1}', headers, request.url)
+
+    return handler
+
+
+def client(handler, route=VALUATIONS, method="GET", **kwargs):
+    transport = MemoryTransport().add(method, route, handler=handler)
+    kwargs.setdefault("retry_policy", RetryPolicy(jitter=False))
+    return DIMO(transport=transport, **kwargs), transport
+
+
+def test_retries_idempotent_calls_with_backoff(sleeps):
+    dimo, transport = client(responses(503, 502, 200))
+    assert dimo.valuations.get_valuations("vehicle-jwt", 7) == {"price": 1}
+    assert len(transport.calls) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retry_after_seconds_wins_over_backoff(sleeps):
+    dimo, _ = client(responses(429, 200, headers={"Retry-After": "7"}))
+    dimo.valuations.get_valuations("vehicle-jwt", 7)
+    assert sleeps == [7.0]
+
+
+def test_retry_after_http_date(sleeps):
+    at = datetime.now(timezone.utc) + timedelta(seconds=20)
+    dimo, _ = client(
+        responses(503, 200, headers={"Retry-After": format_datetime(at, usegmt=True)})
+    )
+    dimo.valuations.get_valuations("vehicle-jwt", 7)
+    assert len(sleeps) == 1
+    assert 17 <= sleeps[0] <= 20
+
+
+def test_retry_after_is_capped():
+    policy = RetryPolicy(max_retry_after=5.0)
+    assert policy.retry_after({"Retry-After": "3600"}) == 5.0
+    assert policy.retry_after({"Retry-After": "soon"}) is None
+
+
+def test_gives_up_after_max_retries(sleeps):
+    dimo, transport = client(
+        responses(503), retry_policy=RetryPolicy(max_retries=2, jitter=False)
+    )
+    with pytest.raises(requests.HTTPError, match="503"):
+        dimo.valuations.get_valuations("vehicle-jwt", 7)
+    assert len(transport.calls) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_token_exchange_posts_are_not_retried(sleeps):
+    transport = MemoryTransport().add(
+        "POST", re.compile(r"/tokens/exchange$"), handler=responses(503)
+    )
+    dimo = DIMO(transport=transport)
+    with pytest.raises(requests.HTTPError):
+        dimo.token_exchange.exchange(
+            "developer-jwt",
+            token_id=7,
+            client_id="0xabc",
+            privileges=[1],
+            use_cache=False,
+        )
+    assert len(transport.calls) == 1
+    assert sleeps == []
+
+
+def test_graphql_reads_are_retried(sleeps):
+    dimo, transport = client(
+        responses(503, 200), route=re.compile(r"/query$"), method="POST"
+    )
+    dimo.telemetry.query("query { signals }", "vehicle-jwt")
+    assert len(transport.calls) == 2
+
+
+def test_circuit_breaker_states(clock):
+    breaker = CircuitBreaker("Telemetry", failure_threshold=2, recovery_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_in == 30
+
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_open_circuit_fails_fast_without_calling_the_service(clock):
+    dimo, transport = client(
+        responses(500, 500, 200),
+        retry_policy=RetryPolicy(max_retries=0),
+        circuit_breaker_threshold=2,
+        circuit_breaker_timeout=10,
+    )
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            dimo.valuations.get_valuations("vehicle-jwt", 7)
+    with pytest.raises(CircuitOpenError):
+        dimo.valuations.get_valuations("vehicle-jwt", 7)
+    assert len(transport.calls) == 2
+    assert dimo.circuit_breakers["Valuations"].state == CircuitBreaker.OPEN
+
+    clock.now += 10
+    assert dimo.valuations.get_valuations("vehicle-jwt", 7) == {"price": 1}
+    assert dimo.circuit_breakers["Valuations"].state == CircuitBreaker.CLOSED
+
+
+def test_connection_errors_count_as_failures(sleeps):
+    class FailingTransport(MemoryTransport):
+        transport_errors = (ConnectionError,)
+
+        def request(self, method, url, **kwargs):
+            super().request(method, url, **kwargs)
+            raise ConnectionError("refused")
+
+    transport = FailingTransport()
+    dimo = DIMO(
+        transport=transport,
+        retry_policy=RetryPolicy(max_retries=1, jitter=False),
+        circuit_breaker_threshold=2,
+    )
+    with pytest.raises(ConnectionError):
+        dimo.valuations.get_valuations("vehicle-jwt", 7)
+    assert len(transport.calls) == 2
+    assert dimo.circuit_breakers["Valuations"].state == CircuitBreaker.OPEN
@@ -0,0 +1,69 @@
+import json
+import re
+
+import pytest
+
+from dimo import DIMO, MemoryTransport
+from dimo.errors import DimoValueError
+
+QUERY = re.compile(r"/query$")
+
+
+def telemetry(handler):
+    transport = MemoryTransport().add("POST", QUERY, handler=handler)
+    return DIMO(transport=transport).telemetry, transport
+
+
+def signals(request):
+    variables = json.loads(request.data)["variables"]
+    # Out of order, with Go style fractions, plus a row outside the window
+    return {
+        "data": {
+            "signals": [
+                {"timestamp": variables["startDate"][:10] + "T12:00:00.5Z", "n": 2},
+                {"timestamp": variables["startDate"][:10] + "T00:00:00Z", "n": 1},
+                {"timestamp": "1999-01-01T00:00:00Z", "n": 0},
+            ]
+        }
+    }
+
+
+def test_iter_signals_streams_windows_in_time_order():
+    client, transport = telemetry(signals)
+    rows = list(
+        client.iter_signals(
+            "vehicle-jwt",
+            7,
+            "timestamp speed(agg: MAX)",
+            "2024-01-01",
+            "2024-01-03",
+            interval="12h",
+            window="24h",
+        )
+    )
+    assert [row["timestamp"][:10] for row in rows] == ["2024-01-01"] * 2 + [
+        "2024-01-02"
+    ] * 2
+    assert [row["n"] for row in rows] == [1, 2, 1, 2]
+    assert len(transport.calls) == 2
+
+
+def test_iter_signals_requires_timestamp_before_sending():
+    client, transport = telemetry(signals)
+    with pytest.raises(DimoValueError, match="timestamp"):
+        list(
+            client.iter_signals(
+                "vehicle-jwt", 7, "speed(agg: MAX)", "2024-01-01", "2024-01-03"
+            )
+        )
+    assert transport.calls == []
+
+
+def test_iter_signals_rejects_rows_without_timestamp():
+    client, _ = telemetry(lambda request: {"data": {"signals": [{"ts": "x"}]}})
+    with pytest.raises(DimoValueError, match="timestamp"):
+        list(
+            client.iter_signals(
+                "vehicle-jwt", 7, "ts: timestamp", "2024-01-01", "2024-01-03"
+            )
+        )
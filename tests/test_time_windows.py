@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dimo.errors import DimoValueError
+from dimo.time_windows import format_time, parse_duration, parse_time, plan_windows
+
+UTC = timezone.utc
+
+
+@pytest.mark.parametrize(
+    "value, microsecond",
+    [
+        ("2024-01-01T00:00:00Z", 0),
+        ("2024-01-01T00:00:00.5Z", 500000),
+        ("2024-01-01T00:00:00.12Z", 120000),
+        ("2024-01-01T00:00:00.123Z", 123000),
+        ("2024-01-01T00:00:00.1234Z", 123400),
+        ("2024-01-01T00:00:00.123456Z", 123456),
+        ("2024-01-01T00:00:00.123456789Z", 123456),
+    ],
+)
+def test_parse_time_accepts_any_fraction_length(value, microsecond):
+    assert parse_time(value) == datetime(2024, 1, 1, 0, 0, 0, microsecond, UTC)
+
+
+def test_parse_time_converts_offsets_and_dates_to_utc():
+    assert parse_time("2024-01-01T01:00:00.5+01:00") == datetime(
+        2024, 1, 1, 0, 0, 0, 500000, UTC
+    )
+    assert parse_time("2024-01-01") == datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def test_parse_time_rejects_garbage():
+    with pytest.raises(DimoValueError):
+        parse_time("yesterday")
+
+
+def test_format_time_round_trips():
+    value = datetime(2024, 1, 1, 0, 0, 0, 120000, UTC)
+    assert format_time(value) == "2024-01-01T00:00:00.120000Z"
+    assert parse_time(format_time(value)) == value
+
+
+def test_parse_duration():
+    assert parse_duration("1h30m") == timedelta(minutes=90)
+    assert parse_duration("500ms") == timedelta(milliseconds=500)
+    with pytest.raises(DimoValueError):
+        parse_duration("1 hour")
+
+
+def test_plan_windows_align_to_intervals():
+    windows = plan_windows("2024-01-01", "2024-01-03T12:00:00Z", "24h", "30h")
+    assert [(start.day, end.day, end.hour) for start, end in windows] == [
+        (1, 3, 0),
+        (3, 3, 12),
+    ]
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from dimo.token_cache import VehicleJWTCache
+
+
+def fake_jwt(lifetime):
+    claims = json.dumps({"exp": time.time() + lifetime}).encode()
+    return f"e30.{base64.urlsafe_b64encode(claims).decode().rstrip('=')}.sig"
+
+
+def test_get_returns_a_copy():
+    cache = VehicleJWTCache()
+    cache.put("key", {"token": fake_jwt(3600)})
+    cache.get("key")["token"] = "changed"
+    assert cache.get("key")["token"] != "changed"
+
+
+def test_stale_entries_are_not_returned():
+    cache = VehicleJWTCache(refresh_margin=60)
+    cache.put("key", {"token": fake_jwt(30)})
+    assert cache.get("key") is None
+
+
+def test_key_locks_are_dropped_after_use():
+    cache = VehicleJWTCache()
+    with cache.key_lock("key"):
+        assert len(cache._key_locks) == 1
+    assert cache._key_locks == {}
+
+
+def test_key_lock_is_dropped_after_a_failed_refresh():
+    cache = VehicleJWTCache()
+    with pytest.raises(RuntimeError):
+        with cache.key_lock("key"):
+            raise RuntimeError("exchange failed")
+    assert cache._key_locks == {}
+
+
+def test_key_lock_is_shared_while_in_use():
+    cache = VehicleJWTCache()
+    inside = []
+    entered = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with cache.key_lock("key"):
+            entered.set()
+            release.wait()
+
+    def waiter():
+        with cache.key_lock("key"):
+            inside.append(time.perf_counter())
+
+    first = threading.Thread(target=holder)
+    first.start()
+    entered.wait()
+    second = threading.Thread(target=waiter)
+    second.start()
+    time.sleep(0.05)
+    assert inside == []
+    release.set()
+    first.join()
+    second.join()
+    assert len(inside) == 1
+    assert cache._key_locks == {}
+
+
+def test_async_key_locks_are_dropped_after_use():
+    cache = VehicleJWTCache(lock_factory=asyncio.Lock)
+    order = []
+
+    async def refresh(name):
+        async with cache.key_lock("key"):
+            order.append(name)
+            await asyncio.sleep(0)
+            order.append(name)
+
+    async def main():
+        await asyncio.gather(refresh("a"), refresh("b"))
+
+    asyncio.run(main())
+    assert order == ["a", "a", "b", "b"]
+    assert cache._key_locks == {}
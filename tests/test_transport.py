@@ -0,0 +1,229 @@
+import asyncio
+import gzip
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dimo import (
+    DIMO,
+    AsyncDIMO,
+    HTTPXTransport,
+    MemoryTransport,
+    RecordingTransport,
+    RequestsTransport,
+    Transport,
+    Urllib3Transport,
+)
+from dimo.errors import DimoError
+from dimo.request import Request
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_async_dimo_memory_transport_with_hook():
+    transport = MemoryTransport().add(
+        "GET", re.compile(r"/v2/vehicles/7/valuations$"), {"price": 1}
+    )
+    events = []
+
+    async def main():
+        async with AsyncDIMO(transport=transport, hooks=[events.append]) as dimo:
+            return await dimo.valuations.get_valuations("vehicle-jwt", 7)
+
+    assert asyncio.run(main()) == {"price": 1}
+    assert len(events) == 1
+    assert events[0].status == 200
+    assert events[0].error is None
+    assert "server" in events[0].timings
+
+
+def test_async_dimo_rejects_sync_context_manager():
+    dimo = AsyncDIMO(transport=MemoryTransport())
+    with pytest.raises(TypeError, match="async with"):
+        with dimo:
+            pass
+    with pytest.raises(TypeError, match="aclose"):
+        dimo.close()
+    asyncio.run(dimo.aclose())
+
+
+def test_clients_use_their_own_transport():
+    first, second = MemoryTransport(), MemoryTransport()
+    for transport in (first, second):
+        transport.add("GET", re.compile(r"/v2/vehicles/7/valuations$"), {"price": 1})
+    with DIMO(transport=first) as dimo:
+        assert dimo.valuations.get_valuations("vehicle-jwt", 7) == {"price": 1}
+    assert len(first.calls) == 1
+    assert second.calls == []
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.dumps(
+            {
+                "method": self.command,
+                "path": self.path,
+                "body": self.rfile.read(length).decode() if length else None,
+            }
+        ).encode()
+        self.send_response(200 if "/missing" not in self.path else 404)
+        self.send_header("Content-Type", "application/json")
+        if self.path.startswith("/gzip"):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+SYNC_TRANSPORTS = [RequestsTransport, Urllib3Transport, HTTPXTransport]
+
+
+@pytest.mark.parametrize("transport_class", SYNC_TRANSPORTS)
+def test_transports_send_params_and_body(server, transport_class):
+    with transport_class() as transport:
+        response = transport.request(
+            "POST",
+            f"{server}/echo",
+            headers={"Content-Type": "application/json"},
+            params={"page": 2, "skip": None},
+            data=b'{"a": 1}',
+        )
+    assert response.status_code == 200
+    assert json.loads(response.content) == {
+        "method": "POST",
+        "path": "/echo?page=2",
+        "body": '{"a": 1}',
+    }
+    assert response.elapsed is not None
+
+
+@pytest.mark.parametrize("transport_class", SYNC_TRANSPORTS)
+def test_transports_report_http_errors(server, transport_class):
+    with transport_class() as transport:
+        response = transport.request("GET", f"{server}/missing")
+    assert response.status_code == 404
+    with pytest.raises(Exception) as error:
+        response.raise_for_status()
+    assert "404" in str(error.value)
+
+
+@pytest.mark.parametrize("transport_class", SYNC_TRANSPORTS)
+def test_connection_failures_are_transport_errors(transport_class):
+    with transport_class() as transport:
+        with pytest.raises(transport.transport_errors):
+            transport.request("GET", "http://127.0.0.1:9/", timeout=1)
+
+
+def test_memory_transport_routes_and_records_calls():
+    transport = MemoryTransport()
+    transport.add("GET", re.compile(r"/items$"), {"first": True})
+    transport.add("GET", re.compile(r"/items$"), {"second": True})
+    response = transport.request("get", "https://api.test/items", params={"a": 1})
+    assert response.json() == {"second": True}
+    assert transport.calls[0].method == "GET"
+    assert transport.calls[0].params == {"a": 1}
+    assert transport.request("GET", "https://api.test/other").status_code == 404
+    transport.reset()
+    assert transport.calls == []
+
+
+def test_recording_transport_replays_in_order(tmp_path):
+    path = str(tmp_path / "recording.jsonl")
+    counter = iter(range(10))
+    upstream = MemoryTransport().add(
+        "POST",
+        "https://api.test/query",
+        handler=lambda request: {"n": next(counter)},
+    )
+    with RecordingTransport(path, "record", upstream) as recorder:
+        for _ in range(2):
+            recorder.request(
+                "POST",
+                "https://api.test/query",
+                headers={"Authorization": "Bearer secret"},
+                data={"q": 1},
+            )
+    with open(path) as handle:
+        assert "secret" not in handle.read()
+
+    replay = RecordingTransport(path)
+
+    def send():
+        return replay.request("POST", "https://api.test/query", data={"q": 1}).json()
+
+    assert [send()["n"] for _ in range(3)] == [0, 1, 1]
+    replay.rewind()
+    assert send() == {"n": 0}
+    with pytest.raises(DimoError, match="No recorded response"):
+        replay.request("POST", "https://api.test/query", data={"q": 2})
+
+
+def test_async_transport_replays_recordings(tmp_path):
+    path = str(tmp_path / "recording.jsonl")
+    upstream = MemoryTransport().add(
+        "GET", re.compile(r"/v2/vehicles/7/valuations$"), {"price": 1}
+    )
+    with DIMO(transport=RecordingTransport(path, "record", upstream)) as dimo:
+        dimo.valuations.get_valuations("vehicle-jwt", 7)
+
+    async def main():
+        async with AsyncDIMO(transport=RecordingTransport(path)) as dimo:
+            return await dimo.valuations.get_valuations("vehicle-jwt", 7)
+
+    assert asyncio.run(main()) == {"price": 1}
+
+
+def test_gzip_recordings_replay_in_sync_and_async_clients(server, tmp_path):
+    path = str(tmp_path / "recording.jsonl")
+    urls = {"Valuations": f"{server}/gzip"}
+    recorder = RecordingTransport(path, "record", RequestsTransport())
+    with DIMO(transport=recorder) as dimo:
+        dimo.urls = {**dimo.urls, **urls}
+        recorded = dimo.valuations.get_valuations("vehicle-jwt", 7)
+    assert recorded["path"] == "/gzip/v2/vehicles/7/valuations"
+
+    with DIMO(transport=RecordingTransport(path)) as dimo:
+        dimo.urls = {**dimo.urls, **urls}
+        assert dimo.valuations.get_valuations("vehicle-jwt", 7) == recorded
+
+    async def main():
+        async with AsyncDIMO(transport=RecordingTransport(path)) as dimo:
+            dimo.urls = {**dimo.urls, **urls}
+            return await dimo.valuations.get_valuations("vehicle-jwt", 7)
+
+    assert asyncio.run(main()) == recorded
+
+
+def test_standalone_request_uses_its_own_transport(server):
+    response = Request("GET", f"{server}/echo")(params={"a": 1})
+    assert response["path"] == "/echo?a=1"
+
+
+def test_transport_subclasses_must_implement_request():
+    class Incomplete(Transport):
+        pass
+
+    with pytest.raises(TypeError, match="request"):
+        Incomplete()
@@ -0,0 +1,69 @@
+import asyncio
+import re
+import threading
+
+import pytest
+
+from dimo import DIMO, AsyncDIMO, MemoryTransport
+from dimo.vin_cache import VINCache
+
+httpx = pytest.importorskip("httpx")
+
+DECODE = re.compile(r"/device-definitions/decode-vin$")
+VIN = "1hgcm82633a004352"
+
+
+@pytest.fixture
+def vin_cache(tmp_path):
+    return VINCache(str(tmp_path / "vins.sqlite3"))
+
+
+def test_vins_are_normalized_and_persisted(vin_cache, tmp_path):
+    vin_cache.put("USA", VIN, {"deviceDefinitionId": "honda_accord_2003"})
+    reopened = VINCache(str(tmp_path / "vins.sqlite3"))
+    assert reopened.get("USA", f" {VIN.upper()} ") == {
+        "deviceDefinitionId": "honda_accord_2003"
+    }
+    assert reopened.get("CAN", VIN) is None
+
+
+def test_decode_vins_only_sends_misses(vin_cache):
+    transport = MemoryTransport().add("POST", DECODE, {"deviceDefinitionId": "new"})
+    vin_cache.put("USA", VIN, {"deviceDefinitionId": "cached"})
+    dimo = DIMO(transport=transport, vin_cache=vin_cache)
+    results = {
+        result.vin: result.response
+        for result in dimo.device_definitions.decode_vins(
+            "developer-jwt", "USA", [VIN, "5YJ3E1EA7KF317000"]
+        )
+    }
+    assert results[VIN] == {"deviceDefinitionId": "cached"}
+    assert results["5YJ3E1EA7KF317000"] == {"deviceDefinitionId": "new"}
+    assert len(transport.calls) == 1
+
+
+def test_async_decode_vin_uses_the_cache_off_the_event_loop(vin_cache):
+    threads = []
+    get = vin_cache.get
+
+    def recording_get(*args):
+        threads.append(threading.current_thread())
+        return get(*args)
+
+    vin_cache.get = recording_get
+    transport = MemoryTransport().add("POST", DECODE, {"deviceDefinitionId": "new"})
+
+    async def main():
+        async with AsyncDIMO(transport=transport, vin_cache=vin_cache) as dimo:
+            first = await dimo.device_definitions.decode_vin(
+                "developer-jwt", "USA", VIN
+            )
+            second = await dimo.device_definitions.decode_vin(
+                "developer-jwt", "USA", VIN
+            )
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second == {"deviceDefinitionId": "new"}
+    assert len(transport.calls) == 1
+    assert threads and threading.main_thread() not in threads